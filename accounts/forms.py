@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.models import User
+from django.db import transaction
 from .models import UserProfile
 
 class SignupForm(forms.ModelForm):
@@ -14,13 +15,15 @@ class SignupForm(forms.ModelForm):
     role = forms.ChoiceField(choices=UserProfile.ROLE_CHOICES, widget=forms.Select(attrs={"class": "form-select"}))
 
     def save(self):
-        user = User.objects.create_user(
-            username=self.cleaned_data['username'],
-            email=self.cleaned_data['email'],
-            password=self.cleaned_data['password']
-        )
-        profile = UserProfile.objects.create(
-            user=user,
-            role=self.cleaned_data['role']
-        )
+        # user and profile are written together or not at all
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=self.cleaned_data['username'],
+                email=self.cleaned_data['email'],
+                password=self.cleaned_data['password']
+            )
+            UserProfile.objects.create(
+                user=user,
+                role=self.cleaned_data['role']
+            )
         return user
@@ -0,0 +1,158 @@
+import contextlib
+import csv
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.models import UserProfile
+from core.models import MaintenanceTeam
+
+
+def _init_worker():
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users, profiles and team memberships from a CSV roster with the columns "
+        "username, email, role, teams (';'-separated names), password, password_hash. "
+        "Only username is required; users without a password get an unusable one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("roster", help="Path to the CSV file, or - for stdin.")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--workers", type=int, default=0,
+            help="Hash plaintext passwords in this many processes (default: in this process).",
+        )
+        parser.add_argument(
+            "--default-role", default=UserProfile.ROLE_TECHNICIAN,
+            choices=[choice for choice, _label in UserProfile.ROLE_CHOICES],
+        )
+
+    def handle(self, *args, **options):
+        self.teams = dict(MaintenanceTeam.objects.values_list("name", "pk"))
+        self.default_role = options["default_role"]
+        self.seen = set()
+        self.line = 1
+
+        executor = None
+        if options["workers"] > 1:
+            executor = ProcessPoolExecutor(options["workers"], initializer=_init_worker)
+
+        totals = {"users": 0, "memberships": 0, "skipped": 0}
+        try:
+            with self.open_roster(options["roster"]) as roster, transaction.atomic():
+                reader = csv.DictReader(roster)
+                if not reader.fieldnames or "username" not in reader.fieldnames:
+                    raise CommandError("The roster needs a header row with a 'username' column.")
+
+                while batch := list(islice(reader, options["batch_size"])):
+                    for key, count in self.provision(batch, executor).items():
+                        totals[key] += count
+        finally:
+            if executor:
+                executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {totals['users']} users with {totals['memberships']} team memberships; "
+            f"skipped {totals['skipped']} existing usernames."
+        ))
+
+    def open_roster(self, path):
+        if path == "-":
+            # the with block must not close stdin
+            return contextlib.nullcontext(sys.stdin)
+        try:
+            return open(path, newline="", encoding="utf-8")
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+    def provision(self, batch, executor):
+        rows = []
+        for row in batch:
+            self.line += 1
+            rows.append(self.clean_row(row))
+
+        existing = set(
+            User.objects.filter(username__in=[row["username"] for row in rows])
+            .values_list("username", flat=True)
+        )
+        rows = [row for row in rows if row["username"] not in existing]
+
+        # hashing is the slow part; fan plaintext passwords out to the pool
+        plaintext = [row for row in rows if row["password"]]
+        hashing = executor.map if executor else map
+        for row, hashed in zip(plaintext, hashing(make_password, [row["password"] for row in plaintext])):
+            row["password_hash"] = hashed
+
+        User.objects.bulk_create(
+            [
+                User(
+                    username=row["username"],
+                    email=row["email"],
+                    password=row["password_hash"] or make_password(None),
+                )
+                for row in rows
+            ],
+            batch_size=len(rows) or None,
+        )
+        user_ids = dict(
+            User.objects.filter(username__in=[row["username"] for row in rows])
+            .values_list("username", "pk")
+        )
+
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_ids[row["username"]], role=row["role"]) for row in rows],
+        )
+        Membership = MaintenanceTeam.members.through
+        memberships = [
+            Membership(maintenanceteam_id=team_id, user_id=user_ids[row["username"]])
+            for row in rows
+            for team_id in row["teams"]
+        ]
+        Membership.objects.bulk_create(memberships, ignore_conflicts=True)
+
+        return {"users": len(rows), "memberships": len(memberships), "skipped": len(existing)}
+
+    def clean_row(self, row):
+        username = User.normalize_username((row.get("username") or "").strip())
+        if not username:
+            raise CommandError(f"Line {self.line}: username is empty.")
+        if username in self.seen:
+            raise CommandError(f"Line {self.line}: duplicate username {username!r}.")
+        self.seen.add(username)
+
+        role = (row.get("role") or "").strip() or self.default_role
+        if role not in dict(UserProfile.ROLE_CHOICES):
+            raise CommandError(f"Line {self.line}: unknown role {role!r}.")
+
+        teams = []
+        for name in filter(None, (name.strip() for name in (row.get("teams") or "").split(";"))):
+            if name not in self.teams:
+                raise CommandError(f"Line {self.line}: unknown team {name!r}.")
+            teams.append(self.teams[name])
+
+        password_hash = (row.get("password_hash") or "").strip()
+        if password_hash:
+            try:
+                identify_hasher(password_hash)
+            except ValueError:
+                raise CommandError(f"Line {self.line}: password_hash is not a recognised hash.")
+
+        return {
+            "username": username,
+            "email": BaseUserManager.normalize_email((row.get("email") or "").strip()),
+            "role": role,
+            "teams": teams,
+            "password": row.get("password") or "",
+            "password_hash": password_hash,
+        }
@@ -1,3 +1,123 @@
-from django.test import TestCase
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.models import MaintenanceTeam
+
+from .forms import SignupForm
+from .models import UserProfile
+
+HEADER = "username,email,role,teams,password,password_hash\n"
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ProvisionUsersTests(TestCase):
+    def setUp(self):
+        self.line = MaintenanceTeam.objects.create(name="Line")
+        self.tools = MaintenanceTeam.objects.create(name="Tools")
+
+    def provision(self, *rows, **options):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as roster:
+            roster.write(HEADER + "".join(f"{row}\n" for row in rows))
+        self.addCleanup(os.unlink, roster.name)
+        out = StringIO()
+        call_command("provision_users", roster.name, stdout=out, **options)
+        return out.getvalue()
+
+    def test_users_profiles_and_memberships_are_created(self):
+        self.provision(
+            "ann,Ann@Example.COM,employee,Line;Tools,,",
+            "bob,,,Tools,,",
+        )
+
+        ann = User.objects.get(username="ann")
+        self.assertEqual(ann.email, "Ann@example.com")
+        self.assertEqual(ann.profile.role, UserProfile.ROLE_EMPLOYEE)
+        self.assertEqual(User.objects.get(username="bob").profile.role, UserProfile.ROLE_TECHNICIAN)
+        self.assertEqual(
+            set(MaintenanceTeam.members.through.objects.values_list("maintenanceteam__name", "user__username")),
+            {("Line", "ann"), ("Tools", "ann"), ("Tools", "bob")},
+        )
+
+    def test_rows_are_inserted_in_batches(self):
+        rows = [f"user{n},,,,," for n in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            self.provision(*rows, batch_size=2)
+
+        inserts = [q["sql"] for q in queries if q["sql"].startswith('INSERT INTO "auth_user"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(UserProfile.objects.count(), 5)
+
+    def test_existing_usernames_are_skipped(self):
+        User.objects.create_user("ann", email="old@example.com")
+
+        out = self.provision("ann,new@example.com,,Line,,", "bob,,,,,")
+
+        self.assertIn("Created 1 users", out)
+        self.assertIn("skipped 1 existing", out)
+        self.assertEqual(User.objects.get(username="ann").email, "old@example.com")
+        self.assertFalse(self.line.members.exists())
+
+    def test_unknown_team_or_role_rolls_everything_back(self):
+        for bad_row in ("carl,,,Paint,,", "carl,,boss,,,"):
+            with self.subTest(bad_row), self.assertRaises(CommandError):
+                # the bad row is in the second batch; the first is undone too
+                self.provision("ann,,,Line,,", "bob,,,,,", bad_row, batch_size=2)
+            self.assertFalse(User.objects.exists())
+            self.assertFalse(UserProfile.objects.exists())
+
+    def test_passwords(self):
+        prehashed = make_password("from-the-old-system")
+        self.provision(
+            "nopass,,,,,",
+            f"hashed,,,,,{prehashed}",
+            "plain,,,,s3cret-pass,",
+        )
+
+        users = {user.username: user for user in User.objects.all()}
+        self.assertFalse(users["nopass"].has_usable_password())
+        self.assertEqual(users["hashed"].password, prehashed)
+        self.assertTrue(users["hashed"].check_password("from-the-old-system"))
+        self.assertTrue(users["plain"].check_password("s3cret-pass"))
+
+    def test_invalid_password_hash_is_rejected(self):
+        with self.assertRaisesMessage(CommandError, "not a recognised hash"):
+            self.provision("ann,,,,,not-a-hash")
+
+    def test_roster_from_stdin_leaves_stdin_open(self):
+        stdin = StringIO(HEADER + "ann,,,,,\n")
+        with mock.patch("sys.stdin", stdin):
+            call_command("provision_users", "-", stdout=StringIO())
+
+        self.assertFalse(stdin.closed)
+        self.assertTrue(User.objects.filter(username="ann").exists())
+
+
+class SignupFormTests(TestCase):
+    data = {"username": "ann", "email": "ann@example.com", "password": "s3cret-pass", "role": "employee"}
+
+    def test_save_creates_user_and_profile(self):
+        form = SignupForm(self.data)
+        self.assertTrue(form.is_valid(), form.errors)
+
+        user = form.save()
+
+        self.assertEqual(user.profile.role, UserProfile.ROLE_EMPLOYEE)
+
+    def test_failed_profile_insert_rolls_back_the_user(self):
+        form = SignupForm(self.data)
+        self.assertTrue(form.is_valid(), form.errors)
+
+        with mock.patch.object(UserProfile.objects, "create", side_effect=IntegrityError), \
+                self.assertRaises(IntegrityError):
+            form.save()
+
+        self.assertFalse(User.objects.filter(username="ann").exists())
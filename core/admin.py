@@ -1,10 +1,19 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.helpers import ActionForm
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.template.response import TemplateResponse
 from django.utils.html import format_html
 from django.urls import reverse
 from urllib.parse import urlencode
 
-from .models import MaintenanceTeam, Equipment, MaintenanceRequest
+from .models import (
+    MaintenanceTeam, Equipment, MaintenanceRequest, ArchivedMaintenanceRequest, Notification, ChangeLog,
+)
+from .rebalance import plan_rebalance, apply_rebalance
+from .services import bulk_scrap_equipment, bulk_reassign_team, bulk_set_default_technician, bulk_delete
 
 
 # ------------------------------
@@ -15,16 +24,28 @@ class MaintenanceTeamAdmin(admin.ModelAdmin):
     list_display = ("name", "member_count")
     search_fields = ("name",)
     filter_horizontal = ("members",)
+    actions = ("rebalance_open_requests",)
 
     def member_count(self, obj):
         return obj.members.count()
 
     member_count.short_description = "Members"
 
+    @admin.action(description="Rebalance open requests across members")
+    def rebalance_open_requests(self, request, queryset):
+        for team in queryset:
+            moved = apply_rebalance(plan_rebalance(team))
+            self.message_user(request, f"{team}: reassigned {moved} open requests.", messages.SUCCESS)
+
 
 # ------------------------------
 # Equipment Admin
 # ------------------------------
+class EquipmentActionForm(ActionForm):
+    team = forms.ModelChoiceField(queryset=MaintenanceTeam.objects.all(), required=False)
+    technician = forms.ModelChoiceField(queryset=User.objects.all(), required=False)
+
+
 @admin.register(Equipment)
 class EquipmentAdmin(admin.ModelAdmin):
     list_display = (
@@ -39,6 +60,8 @@ class EquipmentAdmin(admin.ModelAdmin):
     list_filter = ("department", "team", "is_scrapped")
     search_fields = ("name", "serial_number", "department", "location")
     readonly_fields = ("open_requests_badge",)
+    action_form = EquipmentActionForm
+    actions = ("scrap_selected", "reassign_team", "set_default_technician")
 
     # track current obj so we can filter technician options
     def get_form(self, request, obj=None, **kwargs):
@@ -76,6 +99,65 @@ class EquipmentAdmin(admin.ModelAdmin):
 
     open_requests_badge.short_description = "Open Requests"
 
+    # --- Bulk actions (team / technician come from the action bar) ---
+    def _action_value(self, request, field):
+        form = self.action_form(request.POST)
+        form.fields["action"].choices = self.get_action_choices(request)
+        if not form.is_valid():
+            return None
+        return form.cleaned_data[field]
+
+    def _report(self, request, result):
+        self.message_user(
+            request,
+            f"Updated {result['equipment']} equipment and {result['requests']} open requests.",
+            messages.SUCCESS,
+        )
+
+    @admin.action(description="Scrap selected equipment")
+    def scrap_selected(self, request, queryset):
+        # can't be undone: ask first, the same way "Delete selected" does
+        if request.POST.get("post"):
+            self._report(request, bulk_scrap_equipment(queryset))
+            return None
+
+        equipment = queryset.filter(is_scrapped=False)
+        request.current_app = self.admin_site.name
+        return TemplateResponse(request, "admin/core/equipment/scrap_selected_confirmation.html", {
+            **self.admin_site.each_context(request),
+            "title": "Are you sure?",
+            "opts": self.model._meta,
+            "queryset": queryset,
+            "equipment": equipment,
+            "open_requests": MaintenanceRequest.objects.filter(
+                equipment__in=equipment, state__in=MaintenanceRequest.OPEN_STATES
+            ).count(),
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        })
+
+    @admin.action(description="Move selected equipment to team")
+    def reassign_team(self, request, queryset):
+        team = self._action_value(request, "team")
+        if team is None:
+            self.message_user(request, "Pick a team to move the equipment to.", messages.ERROR)
+            return
+        self._report(request, bulk_reassign_team(queryset, team))
+
+    @admin.action(description="Set default technician (empty to clear)")
+    def set_default_technician(self, request, queryset):
+        technician = self._action_value(request, "technician")
+        try:
+            result = bulk_set_default_technician(queryset, technician)
+        except ValidationError as e:
+            self.message_user(request, " ".join(e.messages), messages.ERROR)
+            return
+        self._report(request, result)
+
+    # "Delete selected": log the rows for sync in one go (their requests are
+    # cascaded and logged by the signal handlers)
+    def delete_queryset(self, request, queryset):
+        bulk_delete(queryset, ChangeLog.KIND_EQUIPMENT)
+
 
 # ------------------------------
 # Maintenance Request Admin
@@ -90,7 +172,7 @@ class MaintenanceRequestAdmin(admin.ModelAdmin):
         "colored_state",
         "created_at",
     )
-    list_filter = ("request_type", "state", "assigned_technician", "equipment")
+    list_filter = ("request_type", "state", "is_overdue", "assigned_technician", "equipment")
     search_fields = ("subject", "equipment__name", "assigned_technician__username")
     list_display_links = ("subject",)
 
@@ -163,4 +245,35 @@ class MaintenanceRequestAdmin(admin.ModelAdmin):
         )
 
     colored_state.short_description = "State"
-    colored_state.admin_order_field = "state"
\ No newline at end of file
+    colored_state.admin_order_field = "state"
+
+    # "Delete selected": log the rows for sync in one go
+    def delete_queryset(self, request, queryset):
+        bulk_delete(queryset, ChangeLog.KIND_REQUEST)
+
+
+# ------------------------------
+# Archived Request Admin (read-only)
+# ------------------------------
+@admin.register(ArchivedMaintenanceRequest)
+class ArchivedMaintenanceRequestAdmin(admin.ModelAdmin):
+    list_display = ("subject", "equipment", "state", "created_at", "archived_at")
+    list_filter = ("state", "request_type")
+    search_fields = ("subject", "equipment__name")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# ------------------------------
+# Notification outbox Admin
+# ------------------------------
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ("subject", "recipient", "created_at", "sent_at", "attempts")
+    list_filter = (("sent_at", admin.EmptyFieldListFilter),)
+    search_fields = ("subject", "recipient")
+    readonly_fields = ("request", "created_at", "sent_at", "attempts", "last_error")
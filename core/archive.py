@@ -0,0 +1,62 @@
+import heapq
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import ArchivedMaintenanceRequest, ChangeLog, MaintenanceRequest
+from .services import bulk_delete
+from .sync import change_log_transaction
+
+
+# ------------------------------
+# Hot/cold archival of closed requests
+# ------------------------------
+# Requests closed (repaired/scrap) longer ago than the retention window are
+# moved to ArchivedMaintenanceRequest in small transactions. A batch is either
+# fully moved or not at all, so an interrupted run is simply started again.
+
+ARCHIVE_FIELDS = [
+    "id", "subject", "equipment_id", "request_type", "state", "assigned_technician_id",
+    "scheduled_date", "duration_hours", "created_by_id", "created_at", "closed_at",
+]
+CLOSED_STATES = [MaintenanceRequest.STATE_REPAIRED, MaintenanceRequest.STATE_SCRAP]
+
+
+def archive_closed_requests(retention_days, batch_size=1000, max_batches=None):
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    closed = MaintenanceRequest.objects.filter(
+        state__in=CLOSED_STATES, closed_at__lt=cutoff
+    ).order_by("pk")
+
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        with change_log_transaction():
+            rows = list(closed.values(*ARCHIVE_FIELDS)[:batch_size])
+            if not rows:
+                break
+            # an id already in the archive fails the batch instead of
+            # deleting a hot row that was never copied
+            ArchivedMaintenanceRequest.objects.bulk_create(
+                [ArchivedMaintenanceRequest(**row) for row in rows]
+            )
+            bulk_delete(
+                MaintenanceRequest.objects.filter(pk__in=[row["id"] for row in rows]),
+                ChangeLog.KIND_REQUEST,
+            )
+        archived += len(rows)
+        batches += 1
+
+    return archived
+
+
+def request_history(equipment, include_archived=False):
+    # closed requests of one equipment, newest first; the archive is only
+    # read when asked for
+    recent = equipment.requests.filter(state__in=CLOSED_STATES).select_related(
+        "assigned_technician"
+    ).order_by("-created_at")
+    if not include_archived:
+        return list(recent)
+
+    archived = equipment.archived_requests.select_related("assigned_technician").order_by("-created_at")
+    return list(heapq.merge(recent, archived, key=lambda req: req.created_at, reverse=True))
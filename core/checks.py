@@ -0,0 +1,19 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def vendor_assets_check(app_configs, **kwargs):
+    # templates load these through {% static %}; missing files mean broken pages
+    root = Path(settings.STATICFILES_DIRS[0])
+    return [
+        Warning(
+            f"Vendored asset {name} is missing.",
+            hint="Run `manage.py vendor_assets` on a machine with internet access and commit the result.",
+            id="core.W001",
+        )
+        for name in getattr(settings, "VENDOR_ASSETS", {})
+        if not (root / name).is_file()
+    ]
@@ -0,0 +1,145 @@
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+
+from .models import MaintenanceRequest
+
+
+# ------------------------------
+# iCalendar feeds for preventive maintenance
+# ------------------------------
+# Every feed has a version stamp in the cache. Signals (core/signals.py) drop
+# the stamps of the team/technician a changed request belongs to, and the bulk
+# helpers drop the global stamp; the next request starts a new version. The
+# ETag, Last-Modified and the cached body are all derived from the stamps, so
+# polling clients get a 304 or a cached body without a database query until
+# something relevant changes.
+#
+# A feed uses at most two cache entries (its version stamp and its body), and
+# stamps are only created for teams/users that exist, so the cache can't be
+# filled up from outside.
+
+BODY_TIMEOUT = 60 * 60 * 24
+GLOBAL_VERSION_KEY = "ics:version"
+
+
+def _version_key(kind, pk):
+    return f"ics:{kind}:{pk}:version"
+
+
+def invalidate_feeds(team_ids=(), technician_ids=()):
+    keys = [_version_key("team", pk) for pk in team_ids if pk is not None]
+    keys += [_version_key("technician", pk) for pk in technician_ids if pk is not None]
+    if keys:
+        # only once committed: a feed built in between would cache the old
+        # rows under the new version
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_all_feeds():
+    transaction.on_commit(lambda: cache.delete(GLOBAL_VERSION_KEY))
+
+
+def feed_version(kind, pk):
+    """Return the feed's (global, own) stamps, or None if a new version must be started."""
+    keys = [GLOBAL_VERSION_KEY, _version_key(kind, pk)]
+    stamps = cache.get_many(keys)
+    if len(stamps) < len(keys):
+        return None
+    return stamps[keys[0]], stamps[keys[1]]
+
+
+def start_feed_version(kind, pk):
+    # first request after an invalidation or eviction. cache.add() keeps a
+    # stamp another worker set in the meantime.
+    keys = [GLOBAL_VERSION_KEY, _version_key(kind, pk)]
+    now = time.time()
+    for key in keys:
+        cache.add(key, now, None)
+    stamps = cache.get_many(keys)
+    return stamps.get(keys[0], now), stamps.get(keys[1], now)
+
+
+def feed_etag(kind, pk, version):
+    return '"ics-{}-{}-{}"'.format(kind, pk, "-".join(f"{stamp:.6f}" for stamp in version))
+
+
+def body_cache_key(kind, pk):
+    # one entry per feed holding (etag, body); a newer version replaces it
+    return f"ics:{kind}:{pk}:body"
+
+
+def feed_requests(kind, pk):
+    requests = MaintenanceRequest.objects.filter(
+        request_type=MaintenanceRequest.TYPE_PREVENTIVE,
+        scheduled_date__isnull=False,
+    ).select_related("equipment", "assigned_technician").order_by("scheduled_date", "pk")
+    if kind == "team":
+        return requests.filter(equipment__team_id=pk)
+    return requests.filter(assigned_technician_id=pk)
+
+
+# ------------------------------
+# iCalendar (RFC 5545) output
+# ------------------------------
+def _escape(text):
+    return (
+        str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    # content lines are limited to 75 octets; continuation lines start with a space
+    out, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > 75:
+            out.append(current)
+            current, size = " ", 1
+        current += char
+        size += width
+    out.append(current)
+    return "\r\n".join(out) + "\r\n"
+
+
+def ics_header(name):
+    return "".join(_fold(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//GearGuard//Preventive Maintenance//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        "X-WR-CALNAME:" + _escape(f"GearGuard - {name}"),
+    ))
+
+
+def ics_footer():
+    return _fold("END:VCALENDAR")
+
+
+def ics_event(req, stamp, build_url):
+    status = "CANCELLED" if req.state == MaintenanceRequest.STATE_SCRAP else "CONFIRMED"
+    technician = req.assigned_technician.username if req.assigned_technician else "unassigned"
+    summary = f"{req.subject} ({req.equipment.name})"
+    description = f"State: {req.get_state_display()}\nTechnician: {technician}"
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:maintenance-request-{req.pk}@gearguard",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{req.scheduled_date:%Y%m%d}",
+        f"DTEND;VALUE=DATE:{req.scheduled_date + timedelta(days=1):%Y%m%d}",
+        f"SUMMARY:{_escape(summary)}",
+        f"DESCRIPTION:{_escape(description)}",
+        f"LOCATION:{_escape(req.equipment.location)}",
+        f"URL:{build_url(reverse('request_detail', args=[req.pk]))}",
+        f"STATUS:{status}",
+        "END:VEVENT",
+    ]
+    return "".join(_fold(line) for line in lines)
+
+
+def ics_stamp(timestamp):
+    return datetime.fromtimestamp(timestamp, dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
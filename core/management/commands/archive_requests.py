@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import archive_closed_requests
+
+
+class Command(BaseCommand):
+    help = "Move requests closed longer ago than the retention window to the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=365,
+            help="Keep requests closed within this many days in the hot table.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--max-batches", type=int,
+            help="Stop after this many batches; the next run continues where this one stopped.",
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] < 0 or options["batch_size"] < 1:
+            raise CommandError("--days must be >= 0 and --batch-size >= 1.")
+
+        archived = archive_closed_requests(
+            options["days"], options["batch_size"], options["max_batches"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} closed requests."))
@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import MaintenanceTeam
+from core.rebalance import plan_rebalance, apply_rebalance
+
+
+class Command(BaseCommand):
+    help = "Redistribute a maintenance team's open requests across its available members."
+
+    def add_arguments(self, parser):
+        parser.add_argument("team", help="Team name or id.")
+        parser.add_argument(
+            "--away", action="append", default=[], metavar="USERNAME",
+            help="Technician to take out of the rotation (repeatable).",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Print the planned changes without saving them.",
+        )
+
+    def handle(self, *args, **options):
+        lookup = {"pk": options["team"]} if options["team"].isdigit() else {"name": options["team"]}
+        try:
+            team = MaintenanceTeam.objects.get(**lookup)
+        except MaintenanceTeam.DoesNotExist:
+            raise CommandError(f"Team {options['team']!r} does not exist.")
+
+        away = dict(User.objects.filter(username__in=options["away"]).values_list("username", "pk"))
+        missing = set(options["away"]) - set(away)
+        if missing:
+            raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        changes = plan_rebalance(team, unavailable=away.values())
+
+        tech_ids = {tech for change in changes for tech in change[2:]}
+        names = dict(User.objects.filter(pk__in=tech_ids).values_list("pk", "username"))
+        for pk, subject, old_tech, new_tech in changes:
+            self.stdout.write(
+                f"#{pk} {subject}: {names.get(old_tech, '-')} -> {names.get(new_tech, '-')}"
+            )
+
+        if options["dry_run"]:
+            self.stdout.write(f"{len(changes)} requests would be reassigned (dry run).")
+            return
+
+        apply_rebalance(changes)
+        self.stdout.write(self.style.SUCCESS(f"Reassigned {len(changes)} requests in {team}."))
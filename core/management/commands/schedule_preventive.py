@@ -0,0 +1,84 @@
+import random
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.scheduling import plan_schedule, apply_schedule, pack_jobs
+
+
+class Command(BaseCommand):
+    help = "Spread open preventive requests over technicians' daily capacity."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day to schedule (YYYY-MM-DD, default today).")
+        parser.add_argument("--days", type=int, default=20, help="Number of working days to plan.")
+        parser.add_argument("--capacity", type=float, default=8.0, help="Hours per technician per day.")
+        parser.add_argument(
+            "--reschedule", action="store_true",
+            help="Also move new requests already scheduled inside the horizon.",
+        )
+        parser.add_argument("--include-weekends", action="store_true")
+        parser.add_argument("--dry-run", action="store_true", help="Print the plan without saving it.")
+        parser.add_argument(
+            "--benchmark", type=int, metavar="JOBS",
+            help="Time the packing step on JOBS synthetic jobs; the database is not touched.",
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] < 1 or options["capacity"] <= 0:
+            raise CommandError("--days and --capacity must be positive.")
+
+        if options["benchmark"]:
+            return self.benchmark(options["benchmark"], options["days"], options["capacity"])
+
+        try:
+            start = date.fromisoformat(options["start"]) if options["start"] else timezone.now().date()
+        except ValueError:
+            raise CommandError("--start must be a YYYY-MM-DD date.")
+
+        changes, unplaced = plan_schedule(
+            start,
+            options["days"],
+            options["capacity"],
+            reschedule=options["reschedule"],
+            include_weekends=options["include_weekends"],
+        )
+
+        if options["verbosity"] > 1 or options["dry_run"]:
+            for pk, tech, day, hours in sorted(changes, key=lambda change: (change[2], change[1])):
+                self.stdout.write(f"#{pk}: technician {tech} on {day} (~{hours:.1f}h)")
+        if unplaced:
+            self.stdout.write(self.style.WARNING(
+                f"{len(unplaced)} requests did not fit in the horizon or are longer than --capacity: "
+                + ", ".join(f"#{pk}" for pk in unplaced[:20])
+                + (" ..." if len(unplaced) > 20 else "")
+            ))
+
+        if options["dry_run"]:
+            self.stdout.write(f"{len(changes)} requests would be scheduled (dry run).")
+            return
+
+        apply_schedule(changes)
+        self.stdout.write(self.style.SUCCESS(f"Scheduled {len(changes)} preventive requests."))
+
+    def benchmark(self, n_jobs, n_days, capacity):
+        rng = random.Random(0)
+        team_members = {team: list(range(team * 10, team * 10 + 10)) for team in range(n_jobs // 500 + 1)}
+        teams = list(team_members)
+        jobs = []
+        for key in range(n_jobs):
+            team = rng.choice(teams)
+            tech = rng.choice(team_members[team]) if rng.random() < 0.7 else None
+            jobs.append((key, rng.uniform(0.5, 6.0), tech, team))
+
+        started = time.perf_counter()
+        placed, unplaced = pack_jobs(jobs, team_members, n_days, capacity)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{n_jobs} jobs, {sum(map(len, team_members.values()))} technicians, {n_days} days: "
+            f"placed {len(placed)}, unplaced {len(unplaced)} in {elapsed:.3f}s "
+            f"({n_jobs / elapsed:,.0f} jobs/s)"
+        )
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import send_pending_notifications
+
+
+class Command(BaseCommand):
+    help = "Send queued notifications through the configured email backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument(
+            "--watch", type=float, metavar="SECONDS",
+            help="Keep running and drain the outbox every SECONDS.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = send_pending_notifications(options["batch_size"], options["max_attempts"])
+            if result["sent"] or result["failed"] or not options["watch"]:
+                self.stdout.write(f"Sent {result['sent']} notifications, {result['failed']} failed.")
+            if not options["watch"]:
+                return
+            time.sleep(options["watch"])
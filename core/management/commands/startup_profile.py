@@ -0,0 +1,86 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# runs in a fresh interpreter so nothing is imported or cached yet
+PROFILE_SCRIPT = """
+import importlib, json, time
+timings = {}
+
+started = time.perf_counter()
+import django
+django.setup()
+timings["django.setup()"] = time.perf_counter() - started
+
+started = time.perf_counter()
+importlib.import_module("gearguard.%(entry)s")
+timings["import gearguard.%(entry)s"] = time.perf_counter() - started
+
+from gearguard import warmup
+for name, (count, seconds) in warmup.warm_up(database=%(database)r).items():
+    timings["warm-up: %%s (%%d)" %% (name, count)] = seconds
+
+print(json.dumps(timings))
+"""
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the WSGI/ASGI application in a fresh interpreter and report import time "
+        "per module plus the cost of each initialization and warm-up step."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entry", choices=["wsgi", "asgi"], default="wsgi")
+        parser.add_argument("--limit", type=int, default=25, help="Number of modules to list.")
+        parser.add_argument(
+            "--sort", choices=["cumulative", "self"], default="cumulative",
+            help="Order modules by cumulative (including their imports) or self time.",
+        )
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "GEARGUARD_WARMUP": "0"}
+        env.setdefault("DJANGO_SETTINGS_MODULE", "gearguard.settings")
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT % {"entry": options["entry"], "database": options["entry"] == "wsgi"}],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"Startup failed:\n{proc.stderr[-4000:]}")
+
+        modules = []
+        packages = defaultdict(int)
+        for line in proc.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                self_us, cumulative_us, _indent, module = match.groups()
+                modules.append((module, int(self_us), int(cumulative_us)))
+                packages[module.split(".")[0]] += int(self_us)
+
+        timings = json.loads(proc.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Initialization"))
+        for step, seconds in timings.items():
+            self.stdout.write(f"  {seconds * 1000:9.1f} ms  {step}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Slowest imports (by {options['sort']} time)"))
+        column = 2 if options["sort"] == "cumulative" else 1
+        self.stdout.write(f"  {'self ms':>9}  {'cumul. ms':>9}  module")
+        for module, self_us, cumulative_us in sorted(modules, key=lambda m: -m[column])[:options["limit"]]:
+            self.stdout.write(f"  {self_us / 1000:9.1f}  {cumulative_us / 1000:9.1f}  {module}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Import time by top-level package"))
+        for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[:options["limit"]]:
+            self.stdout.write(f"  {self_us / 1000:9.1f} ms  {package}")
+
+        total = sum(self_us for _module, self_us, _cumulative in modules)
+        self.stdout.write(f"\n{len(modules)} modules imported in {total / 1000:.1f} ms")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.notifications import sweep_overdue
+
+
+class Command(BaseCommand):
+    help = "Flag newly overdue open requests and queue a notification for each."
+
+    def handle(self, *args, **options):
+        result = sweep_overdue()
+        self.stdout.write(self.style.SUCCESS(
+            f"Flagged {result['flagged']} overdue requests, cleared {result['cleared']}, "
+            f"queued {result['queued']} notifications."
+        ))
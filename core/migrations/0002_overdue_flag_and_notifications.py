@@ -0,0 +1,63 @@
+# Generated by Django 6.0 on 2026-10-19 07:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def flag_existing_overdue(apps, schema_editor):
+    # requests that were already late before the sweeper existed get the flag
+    # without a notification
+    MaintenanceRequest = apps.get_model('core', 'MaintenanceRequest')
+    MaintenanceRequest.objects.filter(
+        state__in=['new', 'in_progress'],
+        scheduled_date__lt=timezone.now().date(),
+    ).update(is_overdue=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=254)),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='maintenancerequest',
+            name='is_overdue',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(condition=models.Q(('is_overdue', False), ('state__in', ['new', 'in_progress'])), fields=['scheduled_date'], name='core_request_overdue_sweep'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancerequest',
+            index=models.Index(condition=models.Q(('is_overdue', True)), fields=['scheduled_date'], name='core_request_overdue'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='request',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='core.maintenancerequest'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['id'], name='core_notification_pending'),
+        ),
+        migrations.RunPython(flag_existing_overdue, migrations.RunPython.noop),
+    ]
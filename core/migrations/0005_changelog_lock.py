@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-19 07:47
+
+from django.db import migrations, models
+
+
+def create_lock_row(apps, schema_editor):
+    ChangeLogLock = apps.get_model('core', 'ChangeLogLock')
+    ChangeLogLock.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.RunPython(create_lock_row, migrations.RunPython.noop),
+    ]
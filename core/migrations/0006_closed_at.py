@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 08:02
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_closed_at(apps, schema_editor):
+    # the real closing time was never recorded; counting from the upgrade
+    # keeps closed requests in the hot table for a full retention window
+    MaintenanceRequest = apps.get_model('core', 'MaintenanceRequest')
+    MaintenanceRequest.objects.filter(state__in=['repaired', 'scrap']).update(closed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_changelog_lock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedmaintenancerequest',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='maintenancerequest',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_closed_at, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 
 class MaintenanceTeam(models.Model):
@@ -56,6 +58,12 @@ class Equipment(models.Model):
     def __str__(self):
         return f"{self.name} ({self.serial_number})"
 
+    def save(self, *args, **kwargs):
+        # the row and its sync log entry (post_save) commit together
+        with transaction.atomic():
+            ChangeLogLock.acquire()
+            super().save(*args, **kwargs)
+
     def open_requests_count(self):
         return self.requests.filter(state__in=["new", "in_progress"]).count()
 
@@ -78,6 +86,7 @@ class MaintenanceRequest(models.Model):
         (STATE_REPAIRED, "Repaired"),
         (STATE_SCRAP, "Scrap"),
     ]
+    OPEN_STATES = [STATE_NEW, STATE_IN_PROGRESS]
 
     subject = models.CharField(max_length=255)
     equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE, related_name="requests")
@@ -94,10 +103,37 @@ class MaintenanceRequest(models.Model):
 
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="created_requests")
     created_at = models.DateTimeField(auto_now_add=True)
+    # when the request was repaired or scrapped; archiving counts from here
+    closed_at = models.DateTimeField(null=True, blank=True)
+
+    # set by the sweep_overdue command, cleared when the request is closed or rescheduled
+    is_overdue = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # sweep_overdue: open requests not flagged yet, by scheduled date
+            models.Index(
+                fields=["scheduled_date"],
+                condition=Q(is_overdue=False, state__in=["new", "in_progress"]),
+                name="core_request_overdue_sweep",
+            ),
+            models.Index(
+                fields=["scheduled_date"],
+                condition=Q(is_overdue=True),
+                name="core_request_overdue",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.subject} ({self.get_state_display()})"
 
+    def is_past_due(self, today):
+        return (
+            self.state in self.OPEN_STATES
+            and self.scheduled_date is not None
+            and self.scheduled_date < today
+        )
+
     def auto_assign_technician(self):
         team = self.equipment.team
         if self.equipment.default_technician:
@@ -113,8 +149,105 @@ class MaintenanceRequest(models.Model):
             if tech:
                 self.assigned_technician = tech
 
-        if self.state == self.STATE_SCRAP:
-            self.equipment.is_scrapped = True
-            self.equipment.save()
+        if self.is_overdue and not self.is_past_due(timezone.now().date()):
+            self.is_overdue = False
+
+        if self.state in self.OPEN_STATES:
+            self.closed_at = None
+        elif self.closed_at is None:
+            self.closed_at = timezone.now()
+
+        # the row and its sync log entry (post_save) commit together
+        with transaction.atomic():
+            ChangeLogLock.acquire()
+            if self.state == self.STATE_SCRAP:
+                self.equipment.is_scrapped = True
+                self.equipment.save()
+            super().save(*args, **kwargs)
+
+
+class ArchivedMaintenanceRequest(models.Model):
+    # cold copy of a closed MaintenanceRequest (same id), moved here by the
+    # archive_requests command so the hot table stays small
+    id = models.BigIntegerField(primary_key=True)
+    subject = models.CharField(max_length=255)
+    equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE, related_name="archived_requests")
+    request_type = models.CharField(max_length=20, choices=MaintenanceRequest.TYPE_CHOICES)
+    state = models.CharField(max_length=20, choices=MaintenanceRequest.STATE_CHOICES)
+
+    assigned_technician = models.ForeignKey(
+        User, null=True, blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+"
+    )
+    scheduled_date = models.DateField(null=True, blank=True)
+    duration_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+    closed_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.subject} ({self.get_state_display()}, archived)"
+
+
+class Notification(models.Model):
+    # outbox row; written by sweep_overdue, drained by send_notifications
+    request = models.ForeignKey(
+        MaintenanceRequest, null=True, blank=True,
+        on_delete=models.SET_NULL,
+        related_name="notifications"
+    )
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["id"], condition=Q(sent_at__isnull=True), name="core_notification_pending"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient}"
+
+
+class ChangeLog(models.Model):
+    # append-only log of request/equipment writes; its id is the sync token
+    # handed to offline devices (see core/sync.py)
+    KIND_REQUEST = "request"
+    KIND_EQUIPMENT = "equipment"
+    KIND_CHOICES = [
+        (KIND_REQUEST, "Maintenance request"),
+        (KIND_EQUIPMENT, "Equipment"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # latest version of a row, for push conflict checks
+            models.Index(fields=["kind", "object_id", "id"], name="core_changelog_object"),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} {self.object_id}{' (deleted)' if self.deleted else ''}"
+
+
+class ChangeLogLock(models.Model):
+    # single row locked by every transaction that writes ChangeLog rows, before
+    # it changes anything else, so log ids become visible in the order they
+    # were handed out (see core/sync.py)
 
-        super().save(*args, **kwargs)
+    @classmethod
+    def acquire(cls):
+        # held until the surrounding transaction ends; locking again is free
+        cls.objects.select_for_update().get_or_create(pk=1)
@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import ChangeLog, MaintenanceRequest, Notification
+from .sync import change_log_transaction, record_changes
+
+
+# ------------------------------
+# Overdue sweep
+# ------------------------------
+def request_url(pk):
+    # emails are read outside the site, so links need scheme and host
+    return settings.SITE_URL.rstrip("/") + reverse("request_detail", args=[pk])
+
+
+def sweep_overdue(today=None):
+    today = today or timezone.now().date()
+    open_requests = MaintenanceRequest.objects.filter(state__in=MaintenanceRequest.OPEN_STATES)
+
+    with change_log_transaction():
+        newly_overdue = list(
+            open_requests.filter(is_overdue=False, scheduled_date__lt=today)
+            .select_for_update(of=("self",))
+            .values_list(
+                "pk", "subject", "scheduled_date", "equipment__name",
+                "assigned_technician__email", "created_by__email",
+            )
+        )
+        flagged_ids = [row[0] for row in newly_overdue]
+        flagged = MaintenanceRequest.objects.filter(pk__in=flagged_ids).update(is_overdue=True)
+
+        # closed or rescheduled since the last sweep
+        cleared_ids = list(MaintenanceRequest.objects.filter(is_overdue=True).exclude(
+            state__in=MaintenanceRequest.OPEN_STATES,
+            scheduled_date__lt=today,
+        ).values_list("pk", flat=True))
+        cleared = MaintenanceRequest.objects.filter(pk__in=cleared_ids).update(is_overdue=False)
+
+        record_changes(ChangeLog.KIND_REQUEST, flagged_ids + cleared_ids)
+
+        outbox = []
+        for pk, subject, scheduled_date, equipment_name, tech_email, creator_email in newly_overdue:
+            recipient = tech_email or creator_email
+            if not recipient:
+                continue
+            outbox.append(Notification(
+                request_id=pk,
+                recipient=recipient,
+                subject=f"Overdue: {subject}",
+                body=(
+                    f"Maintenance request \"{subject}\" for {equipment_name} was scheduled for "
+                    f"{scheduled_date} and is still open.\n\n"
+                    f"{request_url(pk)}\n"
+                ),
+            ))
+        Notification.objects.bulk_create(outbox, batch_size=500)
+
+    return {"flagged": flagged, "cleared": cleared, "queued": len(outbox)}
+
+
+# ------------------------------
+# Outbox worker
+# ------------------------------
+def send_pending_notifications(batch_size=100, max_attempts=5):
+    pending = Notification.objects.filter(sent_at__isnull=True, attempts__lt=max_attempts).order_by("pk")
+    sent = failed = 0
+    last_pk = 0
+
+    # one backend connection for the whole drain. Each batch is locked while
+    # it is sent; rows another worker holds are skipped, so several workers
+    # (e.g. a --watch process and a cron run) never send the same email twice.
+    # SQLite has no row locks: run a single worker there.
+    with get_connection() as connection:
+        while True:
+            with transaction.atomic():
+                batch = list(pending.filter(pk__gt=last_pk).select_for_update(skip_locked=True)[:batch_size])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+
+                errors = {}
+                try:
+                    connection.send_messages([_as_email(n, connection) for n in batch])
+                except Exception:
+                    # retry one by one so a single bad address doesn't fail the batch
+                    for notification in batch:
+                        try:
+                            connection.send_messages([_as_email(notification, connection)])
+                        except Exception as e:
+                            errors[notification.pk] = str(e)
+
+                ok = [n.pk for n in batch if n.pk not in errors]
+                Notification.objects.filter(pk__in=ok).update(
+                    sent_at=timezone.now(), attempts=F("attempts") + 1, last_error=""
+                )
+                for pk, error in errors.items():
+                    Notification.objects.filter(pk=pk).update(attempts=F("attempts") + 1, last_error=error)
+
+            sent += len(ok)
+            failed += len(errors)
+
+    return {"sent": sent, "failed": failed}
+
+
+def _as_email(notification, connection):
+    return EmailMessage(
+        notification.subject,
+        notification.body,
+        to=[notification.recipient],
+        connection=connection,
+    )
@@ -0,0 +1,126 @@
+import heapq
+from collections import defaultdict
+
+from django.db.models import Count
+
+from .feeds import invalidate_all_feeds
+from .models import ChangeLog, MaintenanceRequest
+from .sync import change_log_transaction, record_changes
+
+
+# ------------------------------
+# Team workload rebalancing
+# ------------------------------
+# get_least_loaded_member() only balances when a request is created. This
+# spreads a team's open queue again, e.g. after someone left the team or went
+# on leave. Rules:
+#   - in-progress work stays with its technician while they're available
+#   - equipment.default_technician pins a request to that technician
+#   - everything else (new requests, orphaned requests) may move
+
+
+def plan_rebalance(team, unavailable=()):
+    """Return a list of (request_pk, subject, old_tech_id, new_tech_id)."""
+    unavailable = set(unavailable)
+    members = [pk for pk in team.members.values_list("pk", flat=True) if pk not in unavailable]
+    if not members:
+        return []
+
+    open_requests = list(
+        MaintenanceRequest.objects.filter(
+            equipment__team=team,
+            state__in=MaintenanceRequest.OPEN_STATES,
+        ).order_by("pk").values_list(
+            "pk", "subject", "state", "assigned_technician_id", "equipment__default_technician_id"
+        )
+    )
+
+    # work members already carry for other teams counts toward their load
+    loads = dict.fromkeys(members, 0)
+    other_work = (
+        MaintenanceRequest.objects.filter(
+            assigned_technician_id__in=members,
+            state__in=MaintenanceRequest.OPEN_STATES,
+        ).exclude(equipment__team=team)
+        .values("assigned_technician_id")
+        .annotate(n=Count("pk"))
+    )
+    for row in other_work:
+        loads[row["assigned_technician_id"]] += row["n"]
+
+    assignment = {}
+    movable = defaultdict(list)
+    orphans = []
+    for pk, _subject, state, tech, pinned in open_requests:
+        if state == MaintenanceRequest.STATE_IN_PROGRESS and tech in loads:
+            target = tech
+        elif pinned in loads:
+            target = pinned
+        elif tech in loads:
+            target = tech
+            movable[tech].append(pk)
+        else:
+            orphans.append(pk)
+            continue
+        assignment[pk] = target
+        loads[target] += 1
+
+    # orphans go to whoever is least loaded right now
+    low = [(load, tech) for tech, load in loads.items()]
+    heapq.heapify(low)
+    for pk in orphans:
+        load, tech = heapq.heappop(low)
+        assignment[pk] = tech
+        loads[tech] = load + 1
+        heapq.heappush(low, (load + 1, tech))
+
+    # level out: move new requests from the busiest technician to the least
+    # busy one until they differ by at most one. Heap entries go stale when a
+    # load changes, so each pop is checked against `loads`.
+    high = [(-load, tech) for tech, load in loads.items() if movable[tech]]
+    heapq.heapify(high)
+    while high:
+        neg_load, donor = heapq.heappop(high)
+        if -neg_load != loads[donor]:
+            continue
+        while low[0][0] != loads[low[0][1]]:
+            heapq.heappop(low)
+        load, taker = low[0]
+        if loads[donor] - load <= 1:
+            break
+
+        heapq.heappop(low)
+        assignment[movable[donor].pop()] = taker
+        loads[donor] -= 1
+        loads[taker] += 1
+        heapq.heappush(low, (loads[donor], donor))
+        heapq.heappush(low, (loads[taker], taker))
+        if movable[donor]:
+            heapq.heappush(high, (-loads[donor], donor))
+        if movable[taker]:
+            heapq.heappush(high, (-loads[taker], taker))
+
+    return [
+        (pk, subject, tech, assignment[pk])
+        for pk, subject, _state, tech, _pinned in open_requests
+        if pk in assignment and assignment[pk] != tech
+    ]
+
+
+def apply_rebalance(changes):
+    # one UPDATE per receiving technician; far cheaper than bulk_update's
+    # per-row CASE expression when thousands of rows move
+    by_tech = defaultdict(list)
+    for pk, _subject, _old_tech, new_tech in changes:
+        by_tech[new_tech].append(pk)
+
+    with change_log_transaction():
+        for tech, pks in by_tech.items():
+            for start in range(0, len(pks), 500):
+                MaintenanceRequest.objects.filter(pk__in=pks[start:start + 500]).update(
+                    assigned_technician_id=tech
+                )
+        record_changes(ChangeLog.KIND_REQUEST, [change[0] for change in changes])
+    if changes:
+        invalidate_all_feeds()
+    return len(changes)
@@ -0,0 +1,174 @@
+import heapq
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .feeds import invalidate_all_feeds
+from .models import ArchivedMaintenanceRequest, ChangeLog, MaintenanceRequest, MaintenanceTeam
+from .sync import change_log_transaction, record_changes
+
+
+# ------------------------------
+# Capacity-aware preventive scheduling
+# ------------------------------
+# Preventive jobs are spread over each technician's working days so that no
+# day goes over `capacity` hours. Job length is estimated from the
+# duration_hours recorded on earlier (including archived) requests for the
+# same equipment.
+
+DEFAULT_JOB_HOURS = 2.0
+
+
+def working_days(start, count, include_weekends=False):
+    days = []
+    day = start
+    while len(days) < count:
+        if include_weekends or day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def estimate_hours():
+    """Return ({equipment_id: avg hours}, fallback hours for unknown equipment)."""
+    # repaired requests (the ones with durations) end up in the archive, so
+    # both tables are read; averages are combined from per-table sums/counts
+    totals = defaultdict(lambda: [0.0, 0])
+    for model in (MaintenanceRequest, ArchivedMaintenanceRequest):
+        rows = (
+            model.objects.filter(duration_hours__isnull=False)
+            .values("equipment_id").annotate(total=Sum("duration_hours"), n=Count("pk"))
+        )
+        for row in rows:
+            entry = totals[row["equipment_id"]]
+            entry[0] += float(row["total"])
+            entry[1] += row["n"]
+
+    per_equipment = {equipment: total / n for equipment, (total, n) in totals.items()}
+    hours = sum(total for total, _n in totals.values())
+    count = sum(n for _total, n in totals.values())
+    return per_equipment, hours / count if count else DEFAULT_JOB_HOURS
+
+
+def pack_jobs(jobs, team_members, n_days, capacity, booked=None):
+    """
+    Level jobs over per-technician days.
+
+    jobs:          iterable of (key, hours, tech_id or None, team_id)
+    team_members:  {team_id: [tech_id, ...]} used for unassigned jobs
+    booked:        {(tech_id, day_index): hours} already taken
+
+    Returns ({key: (tech_id, day_index)}, [unplaced keys]).
+    """
+    techs = sorted(
+        {tech for members in team_members.values() for tech in members}
+        | {job[2] for job in jobs if job[2] is not None}
+    )
+    index = {tech: i for i, tech in enumerate(techs)}
+
+    # loads[t * n_days + d] = hours booked for technician t on day d
+    loads = array("d", bytes(8 * len(techs) * n_days))
+    for (tech, day), hours in (booked or {}).items():
+        if tech in index:
+            loads[index[tech] * n_days + day] += hours
+
+    # one min-heap of (load, day, t) per technician and per team. Entries go
+    # stale when a slot's load changes; they're skipped on pop and a fresh
+    # entry is pushed for every heap the technician belongs to.
+    tech_heaps = [[(loads[t * n_days + d], d, t) for d in range(n_days)] for t in range(len(techs))]
+    for heap in tech_heaps:
+        heapq.heapify(heap)
+    heaps_of = [[heap] for heap in tech_heaps]
+    team_heaps = {}
+    for team, members in team_members.items():
+        heap = [(loads[index[tech] * n_days + d], d, index[tech]) for tech in members for d in range(n_days)]
+        heapq.heapify(heap)
+        team_heaps[team] = heap
+        for tech in members:
+            heaps_of[index[tech]].append(heap)
+
+    placed = {}
+    unplaced = []
+    for key, hours, tech, team in sorted(jobs, key=lambda job: -job[1]):
+        heap = tech_heaps[index[tech]] if tech is not None else team_heaps.get(team)
+        while heap and heap[0][0] != loads[heap[0][2] * n_days + heap[0][1]]:
+            heapq.heappop(heap)
+        # a job longer than a day can never fit; it's left for a human to plan
+        if hours > capacity or not heap or heap[0][0] + hours > capacity:
+            unplaced.append(key)
+            continue
+
+        load, day, t = heap[0]
+        slot = t * n_days + day
+        loads[slot] = load + hours
+        for h in heaps_of[t]:
+            heapq.heappush(h, (loads[slot], day, t))
+        placed[key] = (techs[t], day)
+
+    return placed, unplaced
+
+
+def plan_schedule(start, n_days, capacity, reschedule=False, include_weekends=False):
+    """Return (changes, unplaced) where changes are (pk, tech_id, date, hours)."""
+    days = working_days(start, n_days, include_weekends)
+    day_index = {day: i for i, day in enumerate(days)}
+    per_equipment, fallback = estimate_hours()
+
+    # every open request with a date in the horizon takes up its technician's
+    # day; only preventive ones are ours to (re)place
+    open_requests = MaintenanceRequest.objects.filter(
+        state__in=MaintenanceRequest.OPEN_STATES,
+    ).filter(
+        Q(request_type=MaintenanceRequest.TYPE_PREVENTIVE) | Q(scheduled_date__in=days)
+    )
+    fields = (
+        "pk", "request_type", "state", "equipment_id", "assigned_technician_id",
+        "equipment__team_id", "scheduled_date",
+    )
+
+    jobs = []
+    booked = defaultdict(float)
+    for pk, request_type, state, equipment_id, tech, team, scheduled in open_requests.values_list(*fields):
+        hours = per_equipment.get(equipment_id, fallback)
+        movable = (
+            request_type == MaintenanceRequest.TYPE_PREVENTIVE
+            and state == MaintenanceRequest.STATE_NEW
+            and (scheduled is None or scheduled < start or (reschedule and scheduled in day_index))
+        )
+        if movable:
+            jobs.append((pk, hours, tech, team))
+        elif tech is not None and scheduled in day_index:
+            booked[(tech, day_index[scheduled])] += hours
+
+    team_members = defaultdict(list)
+    through = MaintenanceTeam.members.through.objects.values_list("maintenanceteam_id", "user_id")
+    for team, user in through:
+        team_members[team].append(user)
+
+    placed, unplaced = pack_jobs(jobs, team_members, len(days), capacity, booked)
+    hours_of = {job[0]: job[1] for job in jobs}
+    changes = [(pk, tech, days[day], hours_of[pk]) for pk, (tech, day) in placed.items()]
+    return changes, unplaced
+
+
+def apply_schedule(changes):
+    # one UPDATE per (technician, day) instead of one per request
+    groups = defaultdict(list)
+    for pk, tech, date, _hours in changes:
+        groups[(tech, date)].append(pk)
+
+    today = timezone.now().date()
+    with change_log_transaction():
+        for (tech, date), pks in groups.items():
+            values = {"assigned_technician_id": tech, "scheduled_date": date}
+            if date >= today:
+                values["is_overdue"] = False
+            for start in range(0, len(pks), 500):
+                MaintenanceRequest.objects.filter(pk__in=pks[start:start + 500]).update(**values)
+        record_changes(ChangeLog.KIND_REQUEST, [change[0] for change in changes])
+    if changes:
+        invalidate_all_feeds()
+    return len(changes)
@@ -0,0 +1,152 @@
+import heapq
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count
+from django.utils import timezone
+
+from .feeds import invalidate_all_feeds
+from .models import ChangeLog, Equipment, MaintenanceRequest
+from .sync import change_log_transaction, logging_deletes_of, record_changes
+
+
+# ------------------------------
+# Bulk equipment lifecycle changes
+# ------------------------------
+# Everything below works on sets of rows with plain UPDATE statements. That
+# skips MaintenanceRequest.save() / Equipment.save() and their signals, so each
+# function invalidates the ICS feeds and logs sync changes itself. Each
+# function runs in one change_log_transaction() and returns how many rows it
+# touched.
+
+
+def bulk_scrap_equipment(equipment):
+    with change_log_transaction():
+        ids = list(equipment.filter(is_scrapped=False).values_list("pk", flat=True))
+        scrapped = Equipment.objects.filter(pk__in=ids).update(is_scrapped=True)
+
+        # scrapped equipment can't be repaired anymore, close its open requests
+        request_ids = list(MaintenanceRequest.objects.filter(
+            equipment_id__in=ids,
+            state__in=MaintenanceRequest.OPEN_STATES,
+        ).values_list("pk", flat=True))
+        closed = MaintenanceRequest.objects.filter(pk__in=request_ids).update(
+            state=MaintenanceRequest.STATE_SCRAP, is_overdue=False, closed_at=timezone.now()
+        )
+
+        record_changes(ChangeLog.KIND_EQUIPMENT, ids)
+        record_changes(ChangeLog.KIND_REQUEST, request_ids)
+
+    invalidate_all_feeds()
+    return {"equipment": scrapped, "requests": closed}
+
+
+def bulk_reassign_team(equipment, team):
+    members = team.members.values("pk")
+    member_ids = list(members.values_list("pk", flat=True))
+
+    with change_log_transaction():
+        ids = list(equipment.exclude(team=team).values_list("pk", flat=True))
+        moved = Equipment.objects.filter(pk__in=ids).update(team=team)
+
+        # default technician must belong to the new team
+        Equipment.objects.filter(pk__in=ids).exclude(
+            default_technician=None
+        ).exclude(default_technician__in=members).update(default_technician=None)
+
+        # open requests held by someone outside the new team go to the
+        # equipment's default technician, or else to the least loaded member
+        orphans = list(MaintenanceRequest.objects.filter(
+            equipment_id__in=ids,
+            state__in=MaintenanceRequest.OPEN_STATES,
+        ).exclude(assigned_technician__in=members).order_by("pk").values_list(
+            "pk", "equipment__default_technician_id"
+        ))
+        request_ids = [pk for pk, _default in orphans]
+        by_tech = defaultdict(list)
+        for pk, tech in zip(request_ids, _spread(orphans, member_ids)):
+            by_tech[tech].append(pk)
+
+        reassigned = 0
+        for tech, pks in by_tech.items():
+            for start in range(0, len(pks), 500):
+                reassigned += MaintenanceRequest.objects.filter(pk__in=pks[start:start + 500]).update(
+                    assigned_technician_id=tech
+                )
+
+        record_changes(ChangeLog.KIND_EQUIPMENT, ids)
+        record_changes(ChangeLog.KIND_REQUEST, request_ids)
+
+    invalidate_all_feeds()
+    return {"equipment": moved, "requests": reassigned}
+
+
+def _spread(orphans, member_ids):
+    # same rule as MaintenanceRequest.auto_assign_technician(): the default
+    # technician if set, otherwise whoever has the fewest open requests
+    loads = dict.fromkeys(member_ids, 0)
+    counts = (
+        MaintenanceRequest.objects.filter(
+            assigned_technician_id__in=member_ids,
+            state__in=MaintenanceRequest.OPEN_STATES,
+        ).values("assigned_technician_id").annotate(n=Count("pk"))
+    )
+    for row in counts:
+        loads[row["assigned_technician_id"]] = row["n"]
+    for _pk, default in orphans:
+        if default in loads:
+            loads[default] += 1
+
+    low = [(load, tech) for tech, load in loads.items()]
+    heapq.heapify(low)
+    for _pk, default in orphans:
+        if default in loads:
+            yield default
+        elif not low:
+            yield None
+        else:
+            load, tech = heapq.heappop(low)
+            heapq.heappush(low, (load + 1, tech))
+            yield tech
+
+
+def bulk_set_default_technician(equipment, technician):
+    with change_log_transaction():
+        ids = list(equipment.values_list("pk", flat=True))
+        rows = Equipment.objects.filter(pk__in=ids)
+
+        if technician is not None and rows.exclude(team__members=technician).exists():
+            raise ValidationError(
+                f"{technician.username} is not a member of every selected equipment's team."
+            )
+
+        updated = rows.update(default_technician=technician)
+
+        # requests nobody has started yet follow the new default technician
+        request_ids = []
+        if technician is not None:
+            request_ids = list(MaintenanceRequest.objects.filter(
+                equipment_id__in=ids,
+                state=MaintenanceRequest.STATE_NEW,
+            ).exclude(assigned_technician=technician).values_list("pk", flat=True))
+        reassigned = MaintenanceRequest.objects.filter(pk__in=request_ids).update(
+            assigned_technician=technician
+        )
+
+        record_changes(ChangeLog.KIND_EQUIPMENT, ids)
+        record_changes(ChangeLog.KIND_REQUEST, request_ids)
+
+    invalidate_all_feeds()
+    return {"equipment": updated, "requests": reassigned}
+
+
+def bulk_delete(queryset, kind):
+    # queryset.delete() sends post_delete per row; the signal handlers skip
+    # this model's rows and they're logged here in one go (see core/signals.py)
+    with change_log_transaction(), logging_deletes_of(queryset.model):
+        ids = list(queryset.values_list("pk", flat=True))
+        deleted, _per_model = queryset.model.objects.filter(pk__in=ids).delete()
+        record_changes(kind, ids, deleted=True)
+
+    invalidate_all_feeds()
+    return deleted
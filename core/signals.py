@@ -0,0 +1,87 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .feeds import invalidate_all_feeds, invalidate_feeds
+from .models import ChangeLog, ChangeLogLock, Equipment, MaintenanceRequest
+from .sync import deletes_logged_by_caller, record_changes
+
+
+# services.bulk_delete() logs its rows and invalidates the feeds in one go, the
+# same way update() callers do, and marks the model it's deleting so the
+# handlers below skip those rows. Every other delete (instance.delete(), a
+# plain queryset.delete(), cascades) is handled here row by row.
+
+def _logged_by_caller(sender, kwargs):
+    return kwargs["signal"] is post_delete and deletes_logged_by_caller(sender)
+
+
+# ------------------------------
+# ICS feed invalidation
+# ------------------------------
+# Remember what a row looked like when it was loaded, so a save can
+# invalidate the feeds it left as well as the ones it moved into.
+
+@receiver(post_init, sender=MaintenanceRequest)
+def remember_request_feeds(sender, instance, **kwargs):
+    instance._feed_state = (
+        instance.request_type, instance.equipment_id, instance.assigned_technician_id
+    )
+
+
+@receiver(post_save, sender=MaintenanceRequest)
+@receiver(post_delete, sender=MaintenanceRequest)
+def invalidate_request_feeds(sender, instance, **kwargs):
+    if _logged_by_caller(sender, kwargs):
+        return
+    old_type, old_equipment, old_technician = instance._feed_state
+    preventive = MaintenanceRequest.TYPE_PREVENTIVE
+    if instance.request_type == preventive or old_type == preventive:
+        if old_equipment == instance.equipment_id and MaintenanceRequest.equipment.is_cached(instance):
+            team_ids = [instance.equipment.team_id]
+        else:
+            equipment_ids = {instance.equipment_id, old_equipment} - {None}
+            team_ids = Equipment.objects.filter(pk__in=equipment_ids).values_list("team_id", flat=True)
+        invalidate_feeds(team_ids, {instance.assigned_technician_id, old_technician})
+    remember_request_feeds(sender, instance)
+
+
+@receiver(post_init, sender=Equipment)
+def remember_equipment_feeds(sender, instance, **kwargs):
+    instance._feed_state = (instance.name, instance.location, instance.team_id)
+
+
+@receiver(post_save, sender=Equipment)
+def invalidate_equipment_feeds(sender, instance, created, **kwargs):
+    old_name, old_location, old_team = instance._feed_state
+    if not created:
+        if (old_name, old_location) != (instance.name, instance.location):
+            # shown in every feed the equipment's requests appear in
+            invalidate_all_feeds()
+        elif old_team != instance.team_id:
+            invalidate_feeds([old_team, instance.team_id])
+    remember_equipment_feeds(sender, instance)
+
+
+# ------------------------------
+# Sync change log
+# ------------------------------
+# pre_delete runs inside the delete's transaction before any row is removed,
+# so the log lock is taken first (saves take it in Model.save()).
+@receiver(pre_delete, sender=MaintenanceRequest)
+@receiver(pre_delete, sender=Equipment)
+def lock_change_log(sender, instance, **kwargs):
+    ChangeLogLock.acquire()
+
+
+@receiver(post_save, sender=MaintenanceRequest)
+@receiver(post_delete, sender=MaintenanceRequest)
+def log_request_change(sender, instance, **kwargs):
+    if not _logged_by_caller(sender, kwargs):
+        record_changes(ChangeLog.KIND_REQUEST, [instance.pk], deleted=kwargs["signal"] is post_delete)
+
+
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+def log_equipment_change(sender, instance, **kwargs):
+    if not _logged_by_caller(sender, kwargs):
+        record_changes(ChangeLog.KIND_EQUIPMENT, [instance.pk], deleted=kwargs["signal"] is post_delete)
@@ -0,0 +1,219 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+
+from .models import ChangeLog, ChangeLogLock, Equipment, MaintenanceRequest, MaintenanceTeam
+
+
+# ------------------------------
+# Delta sync for offline technician devices
+# ------------------------------
+# Every write to a MaintenanceRequest or Equipment appends a ChangeLog row
+# (signals for single saves, record_changes() for the set-based helpers).
+# A device pulls with the last token it got and receives the current state of
+# everything that changed since, plus a per-row `version` (the newest log id
+# for that row). When pushing, each item carries the version it was edited
+# from; if the row changed on the server since, the item is a conflict.
+#
+# Log ids are handed out at INSERT, not at commit. To keep a token safe, every
+# transaction that logs a change locks the ChangeLogLock row and holds it until
+# commit, so no transaction can commit a lower id after a device has pulled
+# past it. The lock is always taken first, before any row is changed: model
+# saves and deletes do it themselves, set-based writers go through
+# change_log_transaction(). Writers of the log are serialized by this; keep
+# these transactions short.
+
+PULL_LIMIT = 500
+PUSH_LIMIT = 1000
+
+REQUEST_FIELDS = [
+    "id", "subject", "equipment_id", "request_type", "state", "assigned_technician_id",
+    "scheduled_date", "duration_hours", "is_overdue", "created_at",
+]
+EQUIPMENT_FIELDS = [
+    "id", "name", "serial_number", "department", "location", "team_id",
+    "default_technician_id", "assigned_to_id", "is_scrapped",
+]
+
+
+# model whose deletes are being logged by bulk_delete(); the per-row delete
+# signals skip it (see core/signals.py)
+_bulk_deleting = ContextVar("bulk_deleting", default=None)
+
+
+@contextmanager
+def change_log_transaction():
+    with transaction.atomic():
+        ChangeLogLock.acquire()
+        yield
+
+
+@contextmanager
+def logging_deletes_of(model):
+    token = _bulk_deleting.set(model)
+    try:
+        yield
+    finally:
+        _bulk_deleting.reset(token)
+
+
+def deletes_logged_by_caller(model):
+    return _bulk_deleting.get() is model
+
+
+def record_changes(kind, ids, deleted=False):
+    if not ids:
+        return
+    with change_log_transaction():
+        ChangeLog.objects.bulk_create(
+            [ChangeLog(kind=kind, object_id=pk, deleted=deleted) for pk in ids],
+            batch_size=500,
+        )
+
+
+def _versions(kind, ids):
+    return dict(
+        ChangeLog.objects.filter(kind=kind, object_id__in=ids)
+        .values("object_id").annotate(version=Max("pk"))
+        .values_list("object_id", "version")
+    )
+
+
+def _rows(model, fields, ids, versions):
+    rows = []
+    for row in model.objects.filter(pk__in=ids).values(*fields):
+        for key in list(row):
+            if key.endswith("_id"):
+                row[key[:-3]] = row.pop(key)
+        row["version"] = versions.get(row["id"], 0)
+        rows.append(row)
+    return rows
+
+
+def pull_changes(since=None, limit=PULL_LIMIT):
+    if not since:
+        # first sync: everything open plus all equipment
+        last = ChangeLog.objects.aggregate(last=Max("pk"))["last"] or 0
+        request_ids = list(
+            MaintenanceRequest.objects.filter(state__in=MaintenanceRequest.OPEN_STATES)
+            .values_list("pk", flat=True)
+        )
+        equipment_ids = list(Equipment.objects.values_list("pk", flat=True))
+        request_versions = _versions(ChangeLog.KIND_REQUEST, request_ids)
+        equipment_versions = _versions(ChangeLog.KIND_EQUIPMENT, equipment_ids)
+        more = False
+    else:
+        entries = list(
+            ChangeLog.objects.filter(pk__gt=since).order_by("pk").values_list("pk", "kind", "object_id")[:limit + 1]
+        )
+        more = len(entries) > limit
+        entries = entries[:limit]
+        last = entries[-1][0] if entries else since
+
+        request_versions, equipment_versions = {}, {}
+        for pk, kind, object_id in entries:
+            versions = request_versions if kind == ChangeLog.KIND_REQUEST else equipment_versions
+            versions[object_id] = pk
+        request_ids, equipment_ids = list(request_versions), list(equipment_versions)
+
+    requests = _rows(MaintenanceRequest, REQUEST_FIELDS, request_ids, request_versions)
+    equipment = _rows(Equipment, EQUIPMENT_FIELDS, equipment_ids, equipment_versions)
+    return {
+        "token": str(last),
+        "more": more,
+        "requests": requests,
+        "equipment": equipment,
+        "deleted": {
+            "requests": sorted(set(request_ids) - {row["id"] for row in requests}),
+            "equipment": sorted(set(equipment_ids) - {row["id"] for row in equipment}),
+        },
+    }
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def push_changes(items):
+    ids = [item.get("id") for item in items]
+    requests = MaintenanceRequest.objects.select_related("equipment").in_bulk(
+        [pk for pk in ids if _is_int(pk)]
+    )
+    members = set(
+        MaintenanceTeam.members.through.objects.filter(
+            maintenanceteam_id__in={req.equipment.team_id for req in requests.values()}
+        ).values_list("maintenanceteam_id", "user_id")
+    )
+
+    results = []
+    # the lock also makes the version check exact
+    with change_log_transaction():
+        versions = _versions(ChangeLog.KIND_REQUEST, list(requests))
+        for item in items:
+            req = requests.get(item.get("id")) if _is_int(item.get("id")) else None
+            if req is None:
+                results.append({"id": item.get("id"), "status": "not_found"})
+                continue
+            if not _is_int(item.get("version", 0)):
+                results.append({"id": req.pk, "status": "invalid", "error": "version must be an integer."})
+                continue
+            if versions.get(req.pk, 0) > item.get("version", 0):
+                results.append({"id": req.pk, "status": "conflict"})
+                continue
+            try:
+                with transaction.atomic():
+                    _apply(req, item, members)
+            except ValidationError as e:
+                results.append({"id": req.pk, "status": "invalid", "error": " ".join(e.messages)})
+                continue
+            results.append({"id": req.pk, "status": "applied"})
+
+    # send back the server's copy of every row so the device can settle conflicts
+    touched = [result["id"] for result in results if result["status"] != "not_found"]
+    current = {
+        row["id"]: row
+        for row in _rows(MaintenanceRequest, REQUEST_FIELDS, touched, _versions(ChangeLog.KIND_REQUEST, touched))
+    }
+    for result in results:
+        if result["status"] != "not_found" and result["id"] in current:
+            result["request"] = current[result["id"]]
+    return results
+
+
+def _apply(req, item, members):
+    # same rules as the request_detail form
+    if "assigned_technician" in item:
+        tech_id = item["assigned_technician"]
+        if tech_id is not None and not _is_int(tech_id):
+            raise ValidationError("assigned_technician must be a user id or null.")
+        if tech_id is not None and (req.equipment.team_id, tech_id) not in members:
+            raise ValidationError("assigned_technician is not a member of the equipment's team.")
+        req.assigned_technician_id = tech_id
+
+    if "state" in item:
+        if not isinstance(item["state"], str) or item["state"] not in dict(MaintenanceRequest.STATE_CHOICES):
+            raise ValidationError(f"Unknown state {item['state']!r}.")
+        req.state = item["state"]
+
+    if item.get("duration_hours") is not None:
+        if req.state != MaintenanceRequest.STATE_REPAIRED:
+            raise ValidationError("duration_hours is only recorded on repaired requests.")
+        value = item["duration_hours"]
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValidationError("duration_hours must be a number.")
+        try:
+            duration = Decimal(str(value))
+        except InvalidOperation:
+            raise ValidationError("duration_hours must be a number.")
+        if not duration.is_finite():
+            raise ValidationError("duration_hours must be a number.")
+        duration = duration.quantize(Decimal("0.01"))
+        if not Decimal("0") <= duration < Decimal("1000"):
+            raise ValidationError("duration_hours must be between 0 and 999.99.")
+        req.duration_hours = duration
+
+    req.save()
@@ -1,3 +1,499 @@
-from django.test import TestCase
+import tempfile
+from collections import Counter
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection
+from django.template import engines
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from gearguard import warmup
+from gearguard.static import PrecompressedStaticFiles
+
+from .archive import archive_closed_requests
+from .feeds import body_cache_key, feed_version
+from .models import (
+    ArchivedMaintenanceRequest, ChangeLog, Equipment, MaintenanceRequest, MaintenanceTeam, Notification,
+)
+from .notifications import send_pending_notifications, sweep_overdue
+from .rebalance import apply_rebalance, plan_rebalance
+from .scheduling import estimate_hours, pack_jobs, plan_schedule
+from .services import bulk_delete, bulk_reassign_team, bulk_scrap_equipment
+from .sync import pull_changes, push_changes
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    # pages render {% static %} without a collectstatic manifest
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+)
+class GearGuardTestCase(TestCase):
+    """A team with one technician ("tech") and one piece of equipment ("Press")."""
+
+    def setUp(self):
+        cache.clear()
+        self.tech = User.objects.create_user("tech", email="tech@example.com")
+        self.team = self.make_team("Team", self.tech)
+        self.equipment = self.make_equipment(self.team)
+
+    @staticmethod
+    def make_team(name, *members):
+        team = MaintenanceTeam.objects.create(name=name)
+        team.members.add(*members)
+        return team
+
+    @staticmethod
+    def make_equipment(team, name="Press", **fields):
+        fields = {"serial_number": name, "department": "Ops", "location": "Hall", **fields}
+        return Equipment.objects.create(name=name, team=team, **fields)
+
+    def make_request(self, subject="Oil change", equipment=None, **fields):
+        fields = {"request_type": "corrective", "created_by": self.tech, **fields}
+        return MaintenanceRequest.objects.create(
+            subject=subject, equipment=equipment or self.equipment, **fields
+        )
+
+
+class BulkReassignTeamTests(GearGuardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.busy = User.objects.create_user("busy")
+        self.idle = User.objects.create_user("idle")
+        self.new_team = self.make_team("New", self.busy, self.idle)
+        self.equipment.default_technician = self.tech
+        self.equipment.save()
+
+        self.make_request("busy work", self.make_equipment(self.new_team, "Lathe"), assigned_technician=self.busy)
+        for n in range(3):
+            self.make_request(f"job {n}")
+
+    def test_orphaned_requests_go_to_least_loaded_members(self):
+        result = bulk_reassign_team(Equipment.objects.filter(pk=self.equipment.pk), self.new_team)
+
+        self.assertEqual(result, {"equipment": 1, "requests": 3})
+        assigned = list(
+            self.equipment.requests.order_by("pk").values_list("assigned_technician__username", flat=True)
+        )
+        # idle starts at 0 open requests, busy at 1
+        self.assertEqual(assigned, ["idle", "busy", "idle"])
+
+    def test_default_technician_in_new_team_is_kept(self):
+        self.new_team.members.add(self.tech)
+        bulk_reassign_team(Equipment.objects.filter(pk=self.equipment.pk), self.new_team)
+
+        self.assertEqual(
+            set(self.equipment.requests.values_list("assigned_technician", flat=True)), {self.tech.pk}
+        )
+
+
+class ScrapEquipmentAdminTests(GearGuardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_request()
+        self.client.force_login(User.objects.create_superuser("admin"))
+        self.data = {"action": "scrap_selected", "_selected_action": [self.equipment.pk]}
+
+    def test_scrap_asks_for_confirmation_first(self):
+        response = self.client.post("/admin/core/equipment/", self.data)
+
+        self.assertTemplateUsed(response, "admin/core/equipment/scrap_selected_confirmation.html")
+        self.assertEqual(response.context_data["open_requests"], 1)
+        self.equipment.refresh_from_db()
+        self.assertFalse(self.equipment.is_scrapped)
+
+    def test_confirmed_scrap_closes_open_requests(self):
+        response = self.client.post("/admin/core/equipment/", {**self.data, "post": "yes"})
+
+        self.assertRedirects(response, "/admin/core/equipment/")
+        self.equipment.refresh_from_db()
+        self.assertTrue(self.equipment.is_scrapped)
+        self.assertEqual(self.equipment.requests.get().state, MaintenanceRequest.STATE_SCRAP)
+
+
+class RebalanceTests(GearGuardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ann = User.objects.create_user("ann")
+        self.bob = User.objects.create_user("bob")
+        self.team.members.add(self.ann, self.bob)
+
+    def workload(self):
+        return Counter(
+            MaintenanceRequest.objects.values_list("assigned_technician__username", flat=True)
+        )
+
+    def test_open_requests_are_balanced(self):
+        for n in range(10):
+            self.make_request(f"job {n}", assigned_technician=self.tech)
+
+        apply_rebalance(plan_rebalance(self.team))
+
+        loads = self.workload()
+        self.assertEqual(sum(loads.values()), 10)
+        self.assertEqual(set(loads), {"tech", "ann", "bob"})
+        self.assertLessEqual(max(loads.values()) - min(loads.values()), 1)
+
+    def test_pinned_requests_stay_with_default_technician(self):
+        lathe = self.make_equipment(self.team, "Lathe", default_technician=self.tech)
+        for n in range(4):
+            self.make_request(f"lathe {n}", lathe, assigned_technician=self.tech)
+
+        self.assertEqual(plan_rebalance(self.team), [])
+
+    def test_in_progress_work_stays_put(self):
+        for n in range(3):
+            self.make_request(f"started {n}", state="in_progress", assigned_technician=self.tech)
+        waiting = self.make_request("waiting", assigned_technician=self.tech)
+
+        apply_rebalance(plan_rebalance(self.team))
+
+        self.assertEqual(
+            set(MaintenanceRequest.objects.filter(state="in_progress").values_list("assigned_technician", flat=True)),
+            {self.tech.pk},
+        )
+        waiting.refresh_from_db()
+        self.assertIn(waiting.assigned_technician, (self.ann, self.bob))
+
+    def test_unavailable_technician_is_emptied(self):
+        for n in range(4):
+            self.make_request(f"job {n}", assigned_technician=self.tech)
+
+        apply_rebalance(plan_rebalance(self.team, unavailable=[self.tech.pk]))
+
+        self.assertEqual(self.workload(), {"ann": 2, "bob": 2})
+
+    def test_dry_run_writes_nothing(self):
+        for n in range(4):
+            self.make_request(f"job {n}", assigned_technician=self.tech)
+        log_size = ChangeLog.objects.count()
+        out = StringIO()
+
+        call_command("rebalance_team", "Team", "--away", "tech", "--dry-run", stdout=out)
+
+        self.assertIn("4 requests would be reassigned", out.getvalue())
+        self.assertEqual(self.workload(), {"tech": 4})
+        self.assertEqual(ChangeLog.objects.count(), log_size)
+
+
+class PackJobsTests(SimpleTestCase):
+    def test_pinned_job_skips_booked_day(self):
+        placed, unplaced = pack_jobs([("a", 2.0, 1, 10)], {10: [1]}, 5, 8.0, booked={(1, 0): 7.0})
+        self.assertEqual((placed, unplaced), ({"a": (1, 1)}, []))
+
+    def test_pinned_jobs_go_to_least_loaded_days(self):
+        booked = {(1, 0): 6.0, (1, 1): 2.0, (1, 2): 4.0}
+        jobs = [("a", 3.0, 1, 10), ("b", 3.0, 1, 10), ("c", 3.0, 1, 10)]
+        placed, unplaced = pack_jobs(jobs, {10: [1]}, 3, 8.0, booked=booked)
+        self.assertEqual(unplaced, [])
+        # day 0 is left alone: 6h + 3h would go over capacity
+        self.assertEqual(sorted(day for _tech, day in placed.values()), [1, 1, 2])
+
+    def test_unassigned_jobs_fall_back_to_team_members(self):
+        booked = {(1, 0): 8.0, (1, 1): 8.0}
+        jobs = [("a", 4.0, None, 10), ("b", 4.0, None, 10), ("c", 4.0, None, 20)]
+        placed, unplaced = pack_jobs(jobs, {10: [1, 2], 20: [3]}, 2, 8.0, booked=booked)
+        self.assertEqual(unplaced, [])
+        self.assertEqual({placed["a"][0], placed["b"][0]}, {2})
+        self.assertEqual(placed["c"], (3, 0))
+
+    def test_unassigned_job_without_team_members_is_unplaced(self):
+        self.assertEqual(pack_jobs([("a", 1.0, None, 99)], {10: [1]}, 2, 8.0), ({}, ["a"]))
+
+    def test_job_longer_than_capacity_is_unplaced(self):
+        placed, unplaced = pack_jobs([("long", 12.0, 1, 10), ("short", 2.0, 1, 10)], {10: [1]}, 5, 8.0)
+        self.assertEqual(unplaced, ["long"])
+        self.assertEqual(list(placed), ["short"])
+
+
+class PlanScheduleTests(GearGuardTestCase):
+    def test_corrective_work_books_the_day_but_is_not_moved(self):
+        monday = date(2030, 1, 7)
+        self.make_request("breakdown", scheduled_date=monday, assigned_technician=self.tech)
+        self.make_request("unscheduled breakdown", assigned_technician=self.tech)
+        service = self.make_request("service", request_type="preventive", assigned_technician=self.tech)
+
+        # the fallback estimate (2h) fills a day, so the preventive job can't share Monday
+        changes, unplaced = plan_schedule(monday, 2, capacity=2.0)
+
+        self.assertEqual(changes, [(service.pk, self.tech.pk, monday + timedelta(days=1), 2.0)])
+        self.assertEqual(unplaced, [])
+
+
+@override_settings(SITE_URL="https://gear.example.com/")
+class OverdueNotificationTests(GearGuardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.request = self.make_request(request_type="preventive", scheduled_date=date(2024, 1, 1))
+
+    def test_overdue_email_links_to_the_site_and_is_sent_once(self):
+        self.assertEqual(sweep_overdue(today=date(2024, 1, 2))["queued"], 1)
+
+        self.assertEqual(send_pending_notifications(), {"sent": 1, "failed": 0})
+        self.assertEqual(send_pending_notifications(), {"sent": 0, "failed": 0})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(f"https://gear.example.com/requests/{self.request.pk}/", mail.outbox[0].body)
+        self.assertIsNotNone(Notification.objects.get().sent_at)
+
+
+class PrecompressedStaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        for name in ("app.css", "app.css.gz", "app.css.br"):
+            Path(root.name, name).write_text(name)
+        self.app = PrecompressedStaticFiles(lambda environ, start_response: [], root.name, "/static/")
+
+    def encoding(self, accept_encoding):
+        headers = {}
+        self.app(
+            {"PATH_INFO": "/static/app.css", "REQUEST_METHOD": "GET", "HTTP_ACCEPT_ENCODING": accept_encoding},
+            lambda status, response_headers: headers.update(response_headers),
+        )
+        return headers.get("Content-Encoding")
+
+    def test_accept_encoding_q_values(self):
+        self.assertEqual(self.encoding("gzip, deflate, br"), "br")
+        self.assertEqual(self.encoding("br;q=0, gzip"), "gzip")
+        self.assertEqual(self.encoding("gzip;q=0.5, br;q=0.2"), "gzip")
+        self.assertIsNone(self.encoding("gzip;q=0"))
+        self.assertIsNone(self.encoding("identity"))
+        self.assertEqual(self.encoding("*"), "br")
+
+
+class CalendarPageTests(GearGuardTestCase):
+    def test_assets_are_self_hosted(self):
+        response = self.client.get("/calendar/")
+
+        self.assertNotContains(response, "cdn.jsdelivr.net")
+        self.assertNotContains(response, "unpkg.com")
+        self.assertContains(response, '<script src="/static/core/calendar.js">')
+        self.assertIsNotNone(finders.find("core/calendar.js"))
+
+
+class WarmUpTests(SimpleTestCase):
+    def test_template_names_cover_core_and_accounts(self):
+        names = warmup.template_names(engines["django"])
+
+        self.assertIn("core/base.html", names)
+        self.assertIn("accounts/login.html", names)
+        # admin overrides live in the same directory but aren't warmed
+        self.assertFalse([name for name in names if not name.startswith(("core/", "accounts/"))])
+
+    def test_warm_up_compiles_templates_and_skips_database_by_default(self):
+        engine = engines["django"]
+        with mock.patch.object(warmup, "connections") as connections, \
+                mock.patch.object(engine, "get_template", wraps=engine.get_template) as get_template:
+            timings = warmup.warm_up()
+
+        compiled = {call.args[0] for call in get_template.call_args_list}
+        self.assertEqual(compiled, set(warmup.template_names(engine)))
+        self.assertEqual(timings["templates"][0], len(compiled))
+        self.assertNotIn("database", timings)
+        connections.all.assert_not_called()
+
+    def test_database_step_is_opt_in(self):
+        with mock.patch.object(warmup, "connections") as connections:
+            connections.all.return_value = [mock.Mock()]
+            timings = warmup.warm_up(database=True)
+
+        self.assertEqual(timings["database"][0], 1)
+        connections.all.return_value[0].ensure_connection.assert_called_once_with()
+
+
+class EstimateHoursTests(GearGuardTestCase):
+    def test_archived_durations_are_used(self):
+        lathe = self.make_equipment(self.team, "Lathe")
+        for equipment, hours in ((self.equipment, "3.00"), (self.equipment, "5.00"), (lathe, "1.00")):
+            self.make_request("repair", equipment, state="repaired", duration_hours=hours)
+        before = estimate_hours()
+
+        MaintenanceRequest.objects.filter(equipment=self.equipment).update(
+            closed_at=timezone.now() - timedelta(days=400)
+        )
+        self.assertEqual(archive_closed_requests(retention_days=365), 2)
+
+        self.assertEqual(estimate_hours(), before)
+        self.assertEqual(before, ({self.equipment.pk: 4.0, lathe.pk: 1.0}, 3.0))
+
+
+class ArchiveTests(GearGuardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.request = self.make_request()
+        self.long_ago = timezone.now() - timedelta(days=400)
+
+    def test_closed_at_follows_the_state(self):
+        self.assertIsNone(self.request.closed_at)
+
+        self.request.state = MaintenanceRequest.STATE_REPAIRED
+        self.request.save()
+        self.assertIsNotNone(self.request.closed_at)
+
+        self.request.state = MaintenanceRequest.STATE_IN_PROGRESS
+        self.request.save()
+        self.assertIsNone(self.request.closed_at)
+
+    def test_scrapping_equipment_closes_its_requests(self):
+        bulk_scrap_equipment(Equipment.objects.filter(pk=self.equipment.pk))
+
+        self.request.refresh_from_db()
+        self.assertIsNotNone(self.request.closed_at)
+
+    def test_retention_counts_from_closing(self):
+        MaintenanceRequest.objects.filter(pk=self.request.pk).update(created_at=self.long_ago)
+        self.request.refresh_from_db()
+        self.request.state = MaintenanceRequest.STATE_REPAIRED
+        self.request.save()
+
+        self.assertEqual(archive_closed_requests(retention_days=365), 0)
+
+        MaintenanceRequest.objects.filter(pk=self.request.pk).update(closed_at=self.long_ago)
+        self.assertEqual(archive_closed_requests(retention_days=365), 1)
+        archived = ArchivedMaintenanceRequest.objects.get(pk=self.request.pk)
+        self.assertEqual(archived.closed_at, self.long_ago)
+
+    def test_id_already_in_archive_keeps_the_hot_row(self):
+        MaintenanceRequest.objects.filter(pk=self.request.pk).update(
+            state=MaintenanceRequest.STATE_REPAIRED, closed_at=self.long_ago
+        )
+        ArchivedMaintenanceRequest.objects.create(
+            id=self.request.pk, subject="stale copy", equipment=self.equipment,
+            request_type="corrective", state="repaired", created_by=self.tech, created_at=self.long_ago,
+        )
+
+        with self.assertRaises(IntegrityError):
+            archive_closed_requests(retention_days=365)
+
+        self.assertTrue(MaintenanceRequest.objects.filter(pk=self.request.pk).exists())
+
+
+class PreventiveFeedTests(GearGuardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.request = self.make_request(request_type="preventive", scheduled_date=date(2030, 1, 1))
+        self.url = f"/calendar/team/{self.team.pk}.ics"
+
+    def fetch(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        # the body is only cached once fully streamed
+        response.body = response.getvalue()
+        return response
+
+    def test_unchanged_feed_is_answered_from_cache(self):
+        etag = self.fetch()["ETag"]
+        with self.assertNumQueries(0):
+            self.assertEqual(self.fetch(if_none_match=etag).status_code, 304)
+            self.assertEqual(self.fetch().status_code, 200)
+
+    def test_version_changes_only_after_commit(self):
+        etag = self.fetch()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.request.subject = "Oil and filter change"
+            self.request.save()
+            self.assertEqual(self.fetch(if_none_match=etag).status_code, 304)
+
+        response = self.fetch(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Oil and filter change", response.body)
+        # the new body replaced the old one
+        self.assertEqual(cache.get(body_cache_key("team", self.team.pk))[0], response["ETag"])
+
+    def test_unknown_owner_creates_no_cache_entries(self):
+        self.assertEqual(self.client.get("/calendar/team/999.ics").status_code, 404)
+        self.assertIsNone(cache.get("ics:team:999:version"))
+        self.assertIsNone(feed_version("team", 999))
+
+
+class SyncTests(GearGuardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.request = self.make_request()
+
+    def test_pull_returns_committed_changes_immediately(self):
+        token = pull_changes()["token"]
+        self.request.state = MaintenanceRequest.STATE_IN_PROGRESS
+        self.request.save()
+
+        delta = pull_changes(int(token))
+        self.assertEqual([row["state"] for row in delta["requests"]], ["in_progress"])
+        self.assertGreater(int(delta["token"]), int(token))
+
+    def test_malformed_items_are_invalid(self):
+        version = pull_changes()["requests"][0]["version"]
+        base = {"id": self.request.pk, "version": version}
+        items = [
+            {**base, "version": str(version)},
+            {**base, "state": ["repaired"]},
+            {**base, "assigned_technician": "1"},
+            {**base, "state": "repaired", "duration_hours": "nan"},
+            {**base, "state": "repaired", "duration_hours": "Infinity"},
+            {**base, "state": "repaired", "duration_hours": [1]},
+            {"id": [self.request.pk]},
+        ]
+        statuses = [result["status"] for result in push_changes(items)]
+        self.assertEqual(statuses, ["invalid"] * 6 + ["not_found"])
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.state, MaintenanceRequest.STATE_NEW)
+
+    def test_archiving_logs_deletions_in_bulk(self):
+        for n in range(5):
+            self.make_request(f"old {n}", state="repaired")
+        MaintenanceRequest.objects.filter(state="repaired").update(
+            closed_at=timezone.now() - timedelta(days=400)
+        )
+        token = pull_changes()["token"]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(archive_closed_requests(retention_days=365), 5)
+        log_writes = [q["sql"] for q in queries if q["sql"].startswith('INSERT INTO "core_changelog"')]
+        self.assertEqual(len(log_writes), 1)
+
+        delta = pull_changes(int(token))
+        self.assertEqual(len(delta["deleted"]["requests"]), 5)
+        self.assertEqual(ChangeLog.objects.filter(deleted=True).count(), 5)
+
+    def test_failed_log_write_rolls_back_the_save(self):
+        self.request.state = MaintenanceRequest.STATE_IN_PROGRESS
+        with mock.patch.object(ChangeLog.objects, "bulk_create", side_effect=DatabaseError), \
+                self.assertRaises(DatabaseError):
+            self.request.save()
+
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.state, MaintenanceRequest.STATE_NEW)
+
+    def test_plain_queryset_delete_is_logged(self):
+        token = pull_changes()["token"]
+
+        self.equipment.requests.all().delete()
+
+        self.assertEqual(pull_changes(int(token))["deleted"]["requests"], [self.request.pk])
+
+    def test_bulk_delete_logs_in_one_insert(self):
+        self.make_request("second")
+        token = pull_changes()["token"]
+
+        with CaptureQueriesContext(connection) as queries:
+            bulk_delete(MaintenanceRequest.objects.all(), ChangeLog.KIND_REQUEST)
+        log_writes = [q["sql"] for q in queries if q["sql"].startswith('INSERT INTO "core_changelog"')]
+        self.assertEqual(len(log_writes), 1)
+        self.assertEqual(len(pull_changes(int(token))["deleted"]["requests"]), 2)
+
+    def test_log_lock_is_taken_before_rows_change(self):
+        with CaptureQueriesContext(connection) as queries:
+            bulk_scrap_equipment(Equipment.objects.filter(pk=self.equipment.pk))
+        statements = [q["sql"] for q in queries]
+        first_lock = next(i for i, sql in enumerate(statements) if '"core_changeloglock"' in sql)
+        first_write = next(i for i, sql in enumerate(statements) if sql.startswith("UPDATE"))
+        self.assertLess(first_lock, first_write)
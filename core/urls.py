@@ -10,6 +10,9 @@ from .views import (
     update_request_state,
     calendar_view,
     calendar_events,
+    preventive_feed,
+    sync_pull,
+    sync_push,
 )
 
 urlpatterns = [
@@ -32,4 +35,10 @@ urlpatterns = [
     # Calendar
     path('calendar/', calendar_view, name='calendar'),
     path('calendar/events/', calendar_events, name='calendar_events'),
+    path('calendar/team/<int:pk>.ics', preventive_feed, {'kind': 'team'}, name='team_calendar_feed'),
+    path('calendar/technician/<int:pk>.ics', preventive_feed, {'kind': 'technician'}, name='technician_calendar_feed'),
+
+    # Offline device sync
+    path('sync/pull/', sync_pull, name='sync_pull'),
+    path('sync/push/', sync_push, name='sync_push'),
 ]
@@ -1,14 +1,25 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.db.models import Q
 from django.contrib import messages
 from django.core.exceptions import ValidationError
 from django.forms import ModelForm
 from django import forms
-from django.http import JsonResponse
-from django.utils import timezone
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.urls import reverse
 
-from .models import Equipment, MaintenanceRequest
+from .archive import request_history
+from .feeds import (
+    BODY_TIMEOUT, body_cache_key, feed_etag, feed_requests, feed_version,
+    ics_event, ics_footer, ics_header, ics_stamp, start_feed_version,
+)
+from .models import Equipment, MaintenanceRequest, MaintenanceTeam
+from .sync import PULL_LIMIT, PUSH_LIMIT, pull_changes, push_changes
 
 
 def calendar_view(request):
@@ -16,23 +27,62 @@ def calendar_view(request):
 
 
 def calendar_events(request):
-    preventive = MaintenanceRequest.objects.filter(request_type="preventive")
-    today = timezone.now().date()
+    preventive = MaintenanceRequest.objects.filter(
+        request_type="preventive", scheduled_date__isnull=False
+    ).select_related("equipment")
     events = []
     for req in preventive:
-        if not req.scheduled_date:
-            continue
-        overdue = req.scheduled_date < today and req.state != MaintenanceRequest.STATE_REPAIRED
         events.append({
             "id": req.id,
             "title": f"{req.subject} ({req.equipment.name})",
             "start": str(req.scheduled_date),
             "url": reverse("request_detail", args=[req.id]),
-            "color": "#dc3545" if overdue else "#0d6efd"
+            "color": "#dc3545" if req.is_overdue else "#0d6efd"
         })
     return JsonResponse(events, safe=False)
 
 
+def preventive_feed(request, kind, pk):
+    # ICS subscription for calendar apps; see core/feeds.py for the caching
+    owner_model = MaintenanceTeam if kind == "team" else User
+    owner = None
+    version = feed_version(kind, pk)
+    if version is None:
+        owner = get_object_or_404(owner_model, pk=pk)
+        version = start_feed_version(kind, pk)
+    etag = feed_etag(kind, pk, version)
+    last_modified = int(max(version))
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        cached = cache.get(body_cache_key(kind, pk))
+        if cached is not None and cached[0] == etag:
+            response = HttpResponse(cached[1], content_type="text/calendar; charset=utf-8")
+        else:
+            owner = owner or get_object_or_404(owner_model, pk=pk)
+            response = StreamingHttpResponse(
+                _generate_feed(request, kind, owner, etag, ics_stamp(max(version))),
+                content_type="text/calendar; charset=utf-8",
+            )
+
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return response
+
+
+def _generate_feed(request, kind, owner, etag, stamp):
+    chunks = [ics_header(owner.name if kind == "team" else owner.username)]
+    yield chunks[0]
+    for req in feed_requests(kind, owner.pk).iterator(chunk_size=500):
+        chunks.append(ics_event(req, stamp, request.build_absolute_uri))
+        yield chunks[-1]
+    chunks.append(ics_footer())
+    yield chunks[-1]
+    # only cached once fully generated; replaces the body of older versions
+    cache.set(body_cache_key(kind, owner.pk), (etag, "".join(chunks)), BODY_TIMEOUT)
+
+
 class MaintenanceRequestForm(ModelForm):
     class Meta:
         model = MaintenanceRequest
@@ -68,18 +118,19 @@ def equipment_list(request):
 def equipment_detail(request, pk):
     equipment = get_object_or_404(Equipment, pk=pk)
     open_requests = equipment.requests.filter(state__in=["new", "in_progress"])
+    include_archived = request.GET.get('archived') == '1'
     return render(request, 'core/equipment_detail.html', {
         'equipment': equipment,
         'open_requests': open_requests,
+        'history': request_history(equipment, include_archived=include_archived),
+        'include_archived': include_archived,
     })
 
 
 def request_list(request):
-    today = timezone.now().date()
     requests = MaintenanceRequest.objects.select_related("equipment", "assigned_technician")
     return render(request, "core/request_list.html", {
         "requests": requests,
-        "today": today
     })
 
 
@@ -150,7 +201,6 @@ def create_request(request, equipment_id=None):
 
 
 def kanban_board(request):
-    today = timezone.now().date()
     requests = MaintenanceRequest.objects.select_related("equipment", "assigned_technician")
     grouped = {
         "new": requests.filter(state="new"),
@@ -160,7 +210,6 @@ def kanban_board(request):
     }
     return render(request, "core/kanban.html", {
         "grouped": grouped,
-        "today": today
     })
 
 
@@ -174,3 +223,33 @@ def update_request_state(request, pk):
         req.save()
         return JsonResponse({"success": True})
     return JsonResponse({"success": False}, status=400)
+
+
+# ------------------------------
+# Offline device sync (see core/sync.py)
+# ------------------------------
+def sync_pull(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"success": False, "error": "login required"}, status=401)
+    try:
+        since = int(request.GET.get("since") or 0)
+        limit = min(int(request.GET.get("limit") or PULL_LIMIT), PULL_LIMIT)
+    except ValueError:
+        return JsonResponse({"success": False, "error": "invalid token"}, status=400)
+    return JsonResponse(pull_changes(since, max(limit, 1)))
+
+
+def sync_push(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"success": False, "error": "login required"}, status=401)
+    if request.method != "POST":
+        return JsonResponse({"success": False}, status=400)
+    try:
+        changes = json.loads(request.body)["changes"]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"success": False, "error": "expected {\"changes\": [...]}"}, status=400)
+    if not isinstance(changes, list) or not all(isinstance(item, dict) for item in changes):
+        return JsonResponse({"success": False, "error": "changes must be a list of objects"}, status=400)
+    if len(changes) > PUSH_LIMIT:
+        return JsonResponse({"success": False, "error": f"at most {PUSH_LIMIT} changes per push"}, status=400)
+    return JsonResponse({"success": True, "results": push_changes(changes)})
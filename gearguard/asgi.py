@@ -11,6 +11,17 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from gearguard import warmup
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gearguard.settings')
+# requests run in other threads than this one, so connections can't be reused
+# across them; keep persistent connections off under ASGI
+os.environ.setdefault('GEARGUARD_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
+
+# opt-in: GEARGUARD_WARMUP=1 pre-compiles templates and fills the URL resolver
+# before the worker takes traffic. The database step is skipped: a connection
+# opened on this thread would never be used by a request.
+if warmup.enabled():
+    warmup.warm_up(database=False)
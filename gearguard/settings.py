@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -57,13 +58,20 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # compiled templates are kept per process (and pre-filled by
+            # gearguard.warmup when GEARGUARD_WARMUP=1)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -78,6 +86,29 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # keep connections between requests so a warmed-up WSGI worker reuses
+        # them. gearguard/asgi.py sets this to 0: persistent connections
+        # should be disabled under ASGI.
+        'CONN_MAX_AGE': int(os.environ.get('GEARGUARD_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Must be shared by all worker processes: the ICS feed versions live here.
+# Point this at Redis/Memcached when running on more than one host.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+        'OPTIONS': {
+            # each ICS feed needs two entries (version stamp + body); culling
+            # a stamp forces every client of that feed to download it again
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
@@ -117,3 +148,39 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+STATICFILES_DIRS = [BASE_DIR / 'static']
+
+# `manage.py collectstatic` output, served by gearguard.static in gearguard/wsgi.py
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'gearguard.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Third-party assets are self-hosted under static/vendor/. Anything missing
+# can be fetched on a connected machine with `manage.py vendor_assets`.
+VENDOR_ASSETS = {
+    'vendor/bootstrap-5.3.3/css/bootstrap.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+    'vendor/bootstrap-5.3.3/js/bootstrap.bundle.min.js':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js',
+}
+
+
+# Email
+# https://docs.djangoproject.com/en/6.0/topics/email/
+# Overdue notifications are queued in core.Notification and sent by
+# `manage.py send_notifications`; the console backend just prints them.
+
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+DEFAULT_FROM_EMAIL = 'gearguard@localhost'
+
+# Public address of the site, used for links in emails
+SITE_URL = 'http://localhost:8000'
@@ -0,0 +1,133 @@
+"""
+WSGI middleware that serves collected static files straight from STATIC_ROOT.
+
+For every request under STATIC_URL the best precompressed variant written by
+gearguard.storage (``.br``, then ``.gz``) is picked from Accept-Encoding.
+Content-hashed names from the staticfiles manifest are served with a
+one-year ``immutable`` Cache-Control, so browsers never ask for them again.
+Anything not found in STATIC_ROOT falls through to Django.
+"""
+
+import json
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from wsgiref.util import FileWrapper
+
+FOREVER = "public, max-age=31536000, immutable"
+SHORT = "public, max-age=300"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class PrecompressedStaticFiles:
+
+    def __init__(self, application, root, prefix):
+        self.application = application
+        self.root = os.fspath(root) if root else None
+        self.prefix = "/" + prefix.lstrip("/")
+        self.files = None
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if (
+            self.root is None
+            or not path.startswith(self.prefix)
+            or environ.get("REQUEST_METHOD") not in ("GET", "HEAD")
+        ):
+            return self.application(environ, start_response)
+
+        if self.files is None:
+            self.files = self.scan()
+        entry = self.files.get(path[len(self.prefix):])
+        if entry is None:
+            return self.application(environ, start_response)
+        return self.serve(entry, environ, start_response)
+
+    def scan(self):
+        # STATIC_ROOT doesn't change while the process runs; index it once
+        immutable = set()
+        manifest = os.path.join(self.root, "staticfiles.json")
+        if os.path.isfile(manifest):
+            with open(manifest, encoding="utf-8") as f:
+                immutable = set(json.load(f).get("paths", {}).values())
+
+        files = {}
+        for directory, _dirs, names in os.walk(self.root):
+            names = set(names)
+            for filename in names:
+                if filename.endswith((".gz", ".br")) and filename[:-3] in names:
+                    continue
+                full = os.path.join(directory, filename)
+                name = os.path.relpath(full, self.root).replace(os.sep, "/")
+                content_type, _ = mimetypes.guess_type(filename)
+                stat = os.stat(full)
+                files[name] = {
+                    "path": full,
+                    "size": stat.st_size,
+                    "content_type": content_type or "application/octet-stream",
+                    "last_modified": formatdate(stat.st_mtime, usegmt=True),
+                    "mtime": int(stat.st_mtime),
+                    "cache_control": FOREVER if name in immutable else SHORT,
+                    "variants": [
+                        (encoding, full + suffix, os.path.getsize(full + suffix))
+                        for encoding, suffix in ENCODINGS
+                        if filename + suffix in names
+                    ],
+                }
+        return files
+
+    def serve(self, entry, environ, start_response):
+        headers = [
+            ("Cache-Control", entry["cache_control"]),
+            ("Last-Modified", entry["last_modified"]),
+            ("Vary", "Accept-Encoding"),
+        ]
+
+        since = environ.get("HTTP_IF_MODIFIED_SINCE")
+        if since:
+            try:
+                not_modified = parsedate_to_datetime(since).timestamp() >= entry["mtime"]
+            except (TypeError, ValueError):
+                not_modified = False
+            if not_modified:
+                start_response("304 Not Modified", headers)
+                return []
+
+        path, size = entry["path"], entry["size"]
+        accepted = accepted_encodings(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        best = 0
+        for encoding, variant_path, variant_size in entry["variants"]:
+            # ties keep the earlier (smaller) variant
+            q = accepted.get(encoding, accepted.get("*", 0))
+            if q > best:
+                best, path, size, chosen = q, variant_path, variant_size, encoding
+        if best:
+            headers.append(("Content-Encoding", chosen))
+
+        headers += [("Content-Type", entry["content_type"]), ("Content-Length", str(size))]
+        start_response("200 OK", headers)
+        if environ["REQUEST_METHOD"] == "HEAD":
+            return []
+
+        wrapper = environ.get("wsgi.file_wrapper", FileWrapper)
+        return wrapper(open(path, "rb"), 64 * 1024)
+
+
+def accepted_encodings(header):
+    """Parse Accept-Encoding into {coding: q}; q=0 means "not acceptable"."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
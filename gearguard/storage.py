@@ -0,0 +1,49 @@
+"""
+Static files storage for GearGuard.
+
+collectstatic writes every asset under a content-hashed name (via the
+manifest storage) and then drops gzip and, when the optional ``brotli``
+package is installed, brotli siblings next to each text asset. The
+precompressed files are served by gearguard.static.PrecompressedStaticFiles.
+"""
+
+import gzip
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip alone is still a big win
+    brotli = None
+
+
+COMPRESS_EXTENSIONS = {".css", ".js", ".json", ".svg", ".txt", ".html", ".xml", ".map"}
+MIN_COMPRESS_SIZE = 512
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        for name in set(paths) | set(self.hashed_files.values()):
+            path = Path(self.path(name))
+            if path.suffix in COMPRESS_EXTENSIONS and path.is_file():
+                self.compress(path)
+
+    def compress(self, path):
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+
+        # mtime=0 keeps the .gz output identical between builds
+        variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(data, quality=11)
+
+        for suffix, compressed in variants.items():
+            if len(compressed) < len(data):
+                path.with_name(path.name + suffix).write_bytes(compressed)
@@ -0,0 +1,103 @@
+"""
+Optional warm-up for fresh worker processes.
+
+Set GEARGUARD_WARMUP=1 and gearguard/wsgi.py or gearguard/asgi.py will call
+warm_up() once the application is built. It compiles the core/ and accounts/
+templates into the cached loader and fills the URL resolver, so the first real
+requests skip that work.
+
+Opening the database connections ahead of time is a separate opt-in
+(GEARGUARD_WARMUP_DB=1, WSGI only) because connections are per thread: it
+only helps sync workers (gunicorn's default "sync" class, uWSGI without
+threads), where requests are served on the thread that imported the
+application. Threaded workers (gunicorn gthread) and ASGI run requests on
+other threads, so the connection would sit unused.
+
+`manage.py startup_profile` shows what each step costs.
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+
+from django.db import connections
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_PREFIXES = ("core", "accounts")
+
+
+def enabled():
+    return os.environ.get("GEARGUARD_WARMUP") == "1"
+
+
+def database_enabled():
+    return os.environ.get("GEARGUARD_WARMUP_DB") == "1"
+
+
+def template_names(engine):
+    names = set()
+    for root in [*engine.dirs, *get_app_template_dirs("templates")]:
+        root = Path(root)
+        for prefix in TEMPLATE_PREFIXES:
+            for path in (root / prefix).rglob("*.html"):
+                names.add(path.relative_to(root).as_posix())
+    return sorted(names)
+
+
+def warm_templates():
+    engine = engines["django"]
+    names = template_names(engine)
+    for name in names:
+        engine.get_template(name)
+    return len(names)
+
+
+def warm_urls():
+    resolver = get_resolver()
+    # reverse_dict builds the lookup tables lazily on first use
+    return len(resolver.reverse_dict)
+
+
+def warm_database():
+    for connection in connections.all():
+        connection.ensure_connection()
+    return len(connections.all())
+
+
+def _forget_connections():
+    # a forked child must not share the parent's sockets; drop them without
+    # closing (closing would also end the parent's session) and reconnect lazily
+    for connection in connections.all(initialized_only=True):
+        connection.connection = None
+
+
+STEPS = (
+    ("templates", warm_templates),
+    ("urls", warm_urls),
+    ("database", warm_database),
+)
+
+
+def warm_up(database=False):
+    timings = {}
+    for name, step in STEPS:
+        if name == "database" and not database:
+            continue
+        started = time.perf_counter()
+        try:
+            count = step()
+        except Exception:
+            # a failed warm-up must never keep the worker from starting
+            logger.exception("Warm-up step %r failed", name)
+            continue
+        timings[name] = (count, time.perf_counter() - started)
+        logger.info("Warm-up %s: %d items in %.1f ms", name, count, timings[name][1] * 1000)
+
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_forget_connections)
+    return timings
@@ -9,8 +9,21 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from gearguard import warmup
+from gearguard.static import PrecompressedStaticFiles
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gearguard.settings')
 
 application = get_wsgi_application()
+
+# opt-in: GEARGUARD_WARMUP=1 pre-compiles templates and fills the URL resolver
+# before the worker takes traffic. GEARGUARD_WARMUP_DB=1 also opens the DB
+# connections; only set it for sync (single-threaded) workers, see warmup.py.
+if warmup.enabled():
+    warmup.warm_up(database=warmup.database_enabled())
+
+# serve collectstatic output (hashed + precompressed) without hitting Django
+application = PrecompressedStaticFiles(application, settings.STATIC_ROOT, settings.STATIC_URL)
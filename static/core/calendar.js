@@ -0,0 +1,114 @@
+// Month grid for the preventive maintenance calendar (templates/core/calendar.html).
+// Self-hosted so the page works without access to a CDN.
+//
+//   GearGuardCalendar.render(element, {
+//       eventsUrl: '/calendar/events/',         // [{id, title, start: 'YYYY-MM-DD', url, color}]
+//       dateClick(dateStr) { ... },             // click on an empty part of a day
+//   });
+(function () {
+    'use strict';
+
+    const WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'];
+
+    function pad(n) {
+        return String(n).padStart(2, '0');
+    }
+
+    function isoDate(date) {
+        return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}`;
+    }
+
+    function el(tag, className, text) {
+        const node = document.createElement(tag);
+        if (className) node.className = className;
+        if (text !== undefined) node.textContent = text;
+        return node;
+    }
+
+    function render(root, options) {
+        const today = new Date();
+        let month = new Date(today.getFullYear(), today.getMonth(), 1);
+        let eventsByDay = new Map();
+
+        const toolbar = el('div', 'd-flex align-items-center justify-content-between mb-3');
+        const title = el('h2', 'h4 mb-0');
+        const buttons = el('div', 'btn-group');
+        const prev = el('button', 'btn btn-outline-secondary', '‹');
+        const todayButton = el('button', 'btn btn-outline-secondary', 'Today');
+        const next = el('button', 'btn btn-outline-secondary', '›');
+        prev.setAttribute('aria-label', 'Previous month');
+        next.setAttribute('aria-label', 'Next month');
+        buttons.append(prev, todayButton, next);
+        toolbar.append(title, buttons);
+
+        const table = el('table', 'table table-bordered gg-calendar mb-0');
+        const head = el('tr');
+        WEEKDAYS.forEach(name => head.append(el('th', 'text-center small', name)));
+        table.append(el('thead'), el('tbody'));
+        table.tHead.append(head);
+
+        root.replaceChildren(toolbar, table);
+
+        function draw() {
+            title.textContent = month.toLocaleDateString(undefined, {month: 'long', year: 'numeric'});
+
+            // start on the Monday on or before the 1st, always show 6 weeks
+            const day = new Date(month);
+            day.setDate(1 - ((month.getDay() + 6) % 7));
+
+            const body = table.tBodies[0];
+            body.replaceChildren();
+            for (let week = 0; week < 6; week++) {
+                const row = el('tr');
+                for (let weekday = 0; weekday < 7; weekday++) {
+                    const dateStr = isoDate(day);
+                    const cell = el('td', 'gg-calendar-day');
+                    if (day.getMonth() !== month.getMonth()) cell.classList.add('text-muted', 'bg-light');
+                    if (dateStr === isoDate(today)) cell.classList.add('table-info');
+                    cell.dataset.date = dateStr;
+                    cell.append(el('div', 'text-end small', String(day.getDate())));
+
+                    (eventsByDay.get(dateStr) || []).forEach(event => {
+                        const link = el('a', 'd-block text-truncate text-white text-decoration-none rounded px-1 mb-1 small', event.title);
+                        link.href = event.url;
+                        link.title = event.title;
+                        link.style.backgroundColor = event.color || '#0d6efd';
+                        cell.append(link);
+                    });
+
+                    row.append(cell);
+                    day.setDate(day.getDate() + 1);
+                }
+                body.append(row);
+            }
+        }
+
+        table.addEventListener('click', e => {
+            // events are plain links; anything else in a day schedules new work
+            if (e.target.closest('a')) return;
+            const cell = e.target.closest('td[data-date]');
+            if (cell && options.dateClick) options.dateClick(cell.dataset.date);
+        });
+        prev.addEventListener('click', () => { month.setMonth(month.getMonth() - 1); draw(); });
+        next.addEventListener('click', () => { month.setMonth(month.getMonth() + 1); draw(); });
+        todayButton.addEventListener('click', () => {
+            month = new Date(today.getFullYear(), today.getMonth(), 1);
+            draw();
+        });
+
+        draw();
+        fetch(options.eventsUrl, {credentials: 'same-origin'})
+            .then(response => response.json())
+            .then(events => {
+                eventsByDay = new Map();
+                events.forEach(event => {
+                    const list = eventsByDay.get(event.start) || [];
+                    list.push(event);
+                    eventsByDay.set(event.start, list);
+                });
+                draw();
+            });
+    }
+
+    window.GearGuardCalendar = {render};
+})();